@@ -1,8 +1,12 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+
 from PyInstaller.utils.hooks import collect_submodules
 
 hiddenimports = []
 hiddenimports += collect_submodules('appflask')
+# uvicorn resolves its loop and protocol implementations from strings
+hiddenimports += collect_submodules('uvicorn')
 
 
 a = Analysis(
@@ -16,23 +20,22 @@ a = Analysis(
     runtime_hooks=[],
     excludes=[],
     noarchive=False,
-    optimize=0,
+    # APPFLASK_OPTIMIZE=1 or 2 precompiles the bundled modules with -O/-OO
+    optimize=int(os.environ.get('APPFLASK_OPTIMIZE', '0')),
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
+# APPFLASK_BUNDLE=onedir builds an unpacked directory bundle: the binary
+# starts without extracting the archive to a temporary directory first
+onedir = os.environ.get('APPFLASK_BUNDLE', 'onefile') == 'onedir'
+
+exe_options = dict(
     name='${PLACEHOLDER_ARTIFACT_ID}',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
     upx=True,
     upx_exclude=[],
-    runtime_tmpdir=None,
     console=True,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -40,3 +43,25 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+
+if onedir:
+    exe = EXE(pyz, a.scripts, [], exclude_binaries=True, **exe_options)
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        name='${PLACEHOLDER_ARTIFACT_ID}',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        runtime_tmpdir=None,
+        **exe_options,
+    )
@@ -2,39 +2,66 @@
 """Flask application main module.
 
 This module contains the application factory and startup code for the Flask app,
-providing endpoints with global rate limiting functionality.
+providing endpoints with global rate limiting functionality. Importing it does
+not build an application; call ``create_app`` or ``get_app`` for one.
 """
 
+from __future__ import annotations
+
 import logging
+import threading
+
+from typing import TYPE_CHECKING
 
 from flask import Flask
 
 # Import our custom modules
-from appflask.config import get_config
+from appflask.clock import SystemClock
+from appflask.compression import register_compression
+from appflask.concurrency import register_load_shedding
+from appflask.config import resolve_config
 from appflask.errors import register_error_handlers
+from appflask.lanes import register_lanes
 from appflask.limiter import RateLimiterFactory
 from appflask.metrics import metrics
+from appflask.reload import apply_config
 from appflask.routes import main_blueprint
+from appflask.snapshots import register_limiter_snapshots
+from appflask.warmup import warm_up
 
+if TYPE_CHECKING:
+    from appflask.clock import Clock
 
-def create_app() -> Flask:
+
+def create_app(clock: Clock | None = None) -> Flask:
     """Application factory function.
 
+    Args:
+        clock: Clock of the rate limiter, error handlers and metrics.
+            Defaults to the system clock.
+
     Returns:
         Flask: Configured Flask application
 
     """
     app = Flask(__name__)
+    app.clock = clock or SystemClock()
 
-    # Load configuration
-    app_config = get_config()
-    app.config.from_mapping(app_config.to_dict())
+    # Load configuration, resolved once into a read-only snapshot
+    apply_config(app, resolve_config())
 
-    # Configure logging
-    log_level = logging.DEBUG if app.config.get("DEBUG") else logging.INFO
-    logging.basicConfig(level=log_level)
+    # Logging is configured from the snapshot, through the logging queue
     app.logger.info("Starting Flask application...")
 
+    # Classify requests into priority lanes, before any of them is rejected
+    register_lanes(app)
+
+    # Compress the responses, once every other hook has produced them
+    register_compression(app)
+
+    # Shed requests beyond the adaptive concurrency limit, before rate limiting
+    register_load_shedding(app)
+
     # Initialize the rate limiter
     app.limiter = RateLimiterFactory.create_limiter(app)
     app.logger.debug("Rate limiter initialized")
@@ -49,7 +76,38 @@ def create_app() -> Flask:
     # Register blueprints
     app.register_blueprint(main_blueprint)
 
+    # Prime the hot paths, then report ready
+    app.ready = threading.Event()
+    app.drain_started = None
+    metrics.precreate_labels(app)
+    if app.settings["WARMUP_ENABLED"]:
+        elapsed = warm_up(app)
+        app.logger.debug("Warmup completed in %.3fs", elapsed)
+    # Restore the limiter state of the previous process, which warmup resets
+    register_limiter_snapshots(app)
+    app.ready.set()
+
     return app
 
-# Create the Flask application instance for import by other modules
-app = create_app()
+# Shared application instance, created on first use rather than at import
+_app: Flask | None = None
+
+def get_app() -> Flask:
+    """Return the shared application instance, creating it on first use.
+
+    Returns:
+        Flask: The shared Flask application
+
+    """
+    # ruff: noqa: PLW0603
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
+
+def __getattr__(name: str) -> Flask:
+    """Build the module-level ``app`` lazily for modules importing it."""
+    if name == "app":
+        return get_app()
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
@@ -0,0 +1,293 @@
+"""ASGI entry point for the Flask application.
+
+This module exposes the application built by ``create_app`` as an ASGI
+application. Connections are owned by the event loop of an asynchronous
+server, so idle keep-alive connections and slow clients no longer pin a
+thread each; a bounded thread pool only runs the WSGI application while a
+request is actually being handled. Routes, rate limiting, error handlers and
+metrics are the ones of the regular Flask application.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import TYPE_CHECKING, Any
+
+from appflask.drain import begin_drain, finish_drain
+from appflask.logs import stop_logging
+
+if TYPE_CHECKING:
+    import socket
+    from types import FrameType
+
+    from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+# ASGI type aliases
+Scope = dict[str, Any]
+Message = dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+
+def build_environ(scope: Scope, body: bytes) -> dict[str, Any]:
+    """Translate an ASGI HTTP scope and request body into a WSGI environ.
+
+    Args:
+        scope: ASGI connection scope
+        body: Complete request body
+
+    Returns:
+        dict: WSGI environ for the request
+
+    """
+    script_name = scope.get("root_path", "").encode("utf8").decode("latin1")
+    path_info = scope["path"].encode("utf8").decode("latin1")
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": script_name,
+        "PATH_INFO": path_info,
+        "QUERY_STRING": scope["query_string"].decode("ascii"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.input_terminated": True,  # The whole body has already been read
+        "wsgi.errors": BytesIO(),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin1").upper().replace("-", "_")
+        if name not in ("CONTENT_LENGTH", "CONTENT_TYPE"):
+            name = f"HTTP_{name}"
+        value = raw_value.decode("latin1")
+        if name in environ:
+            value = f"{environ[name]},{value}"
+        environ[name] = value
+
+    return environ
+
+
+class WsgiToAsgi:
+    """Serve a WSGI application from an ASGI server.
+
+    Each request runs the WSGI application on a bounded thread pool and hands
+    the response chunks back to the event loop, so streaming responses are
+    forwarded as they are produced.
+
+    Requests that ``is_priority`` accepts by path run on a pool of their own,
+    so they are not queued behind the other requests.
+
+    Attributes:
+        wsgi_app: The wrapped WSGI application
+        executor: Thread pool that runs the WSGI application
+        priority_executor: Thread pool reserved for priority requests, or None
+
+    """
+
+    def __init__(
+        self,
+        wsgi_app: Callable[..., Any],
+        max_workers: int,
+        priority_workers: int = 0,
+        is_priority: Callable[[str], bool] | None = None,
+    ) -> None:
+        """Wrap a WSGI application with a pool of ``max_workers`` threads."""
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="appflask-asgi",
+        )
+        self.priority_executor = ThreadPoolExecutor(
+            max_workers=priority_workers,
+            thread_name_prefix="appflask-asgi-priority",
+        ) if priority_workers and is_priority is not None else None
+        self.is_priority = is_priority
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle one ASGI connection scope."""
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            msg = f"Unsupported ASGI scope type: {scope['type']}"
+            raise ValueError(msg)
+
+        body = await self._read_body(receive)
+        environ = build_environ(scope, body)
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[Message | None] = asyncio.Queue()
+        disconnected = threading.Event()
+
+        def put(message: Message | None) -> None:
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+
+        executor = self.executor
+        if self.priority_executor is not None and self.is_priority(scope["path"]):
+            executor = self.priority_executor
+        future = loop.run_in_executor(
+            executor, self._run_wsgi_app, environ, put, disconnected,
+        )
+        try:
+            while (message := await queue.get()) is not None:
+                await send(message)
+        except OSError:
+            # The client went away; stop producing a streaming response
+            disconnected.set()
+        await future
+
+    async def _read_body(self, receive: Receive) -> bytes:
+        """Read the complete request body from the ASGI receive channel."""
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        return b"".join(chunks)
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        """Answer ASGI lifespan events and release the pool on shutdown."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                if self.priority_executor is not None:
+                    self.priority_executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _run_wsgi_app(
+        self,
+        environ: dict[str, Any],
+        put: Callable[[Message | None], None],
+        disconnected: threading.Event,
+    ) -> None:
+        """Run the WSGI application in a worker thread and emit ASGI messages."""
+        start: Message = {}
+
+        def start_response(
+            status: str,
+            headers: list[tuple[str, str]],
+            exc_info: Any = None,  # noqa: ANN401, ARG001
+        ) -> None:
+            start["type"] = "http.response.start"
+            start["status"] = int(status.split(" ", 1)[0])
+            start["headers"] = [
+                (name.lower().encode("latin1"), value.encode("latin1"))
+                for name, value in headers
+            ]
+
+        try:
+            result = self.wsgi_app(environ, start_response)
+            try:
+                started = False
+                for chunk in result:
+                    if disconnected.is_set():
+                        break
+                    if not chunk:
+                        continue
+                    if not started:
+                        put(start)
+                        started = True
+                    put({"type": "http.response.body", "body": chunk,
+                         "more_body": True})
+                if not started:
+                    put(start)
+                put({"type": "http.response.body", "body": b""})
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        finally:
+            put(None)
+
+
+def create_asgi_app(app: Flask | None = None) -> WsgiToAsgi:
+    """Async application factory function.
+
+    Args:
+        app: Flask application to serve. Defaults to a new one from
+            ``create_app``.
+
+    Returns:
+        WsgiToAsgi: ASGI application serving the Flask application
+
+    """
+    if app is None:
+        from appflask.app import create_app
+        app = create_app()
+
+    from appflask.lanes import PRIORITY_LANE, classify
+
+    return WsgiToAsgi(
+        app,
+        max_workers=app.config["ASGI_MAX_WORKERS"],
+        priority_workers=app.config["ASGI_PRIORITY_WORKERS"],
+        is_priority=lambda path: classify(path, app.settings) == PRIORITY_LANE,
+    )
+
+
+def run_asgi(app: Flask, host: str, port: int) -> None:
+    """Serve the application with uvicorn on the given address.
+
+    On ``SIGTERM`` the readiness probe fails and uvicorn stops accepting,
+    then closes the connections as their requests end; the requests still
+    running at the drain deadline are reported as dropped. Uvicorn raises
+    the signal again once it has stopped, which ends the process without
+    ``atexit`` handlers, so the log queue is written out before.
+
+    Args:
+        app: Flask application to serve
+        host: Interface to bind
+        port: Port to listen on
+
+    """
+    import uvicorn
+
+    class DrainingServer(uvicorn.Server):
+        """Uvicorn server draining the application once asked to exit."""
+
+        def handle_exit(self, sig: int, frame: FrameType | None) -> None:
+            begin_drain(app)
+            super().handle_exit(sig, frame)
+
+        async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+            await super().shutdown(sockets)
+            finish_drain(app)
+            stop_logging()
+
+    config = uvicorn.Config(
+        create_asgi_app(app),
+        host=host,
+        port=port,
+        loop="asyncio",
+        http="h11",
+        lifespan="on",
+        log_config=None,
+        access_log=False,
+        backlog=app.config["ASGI_BACKLOG"],
+        timeout_keep_alive=app.config["ASGI_KEEP_ALIVE_SECONDS"],
+        timeout_graceful_shutdown=app.config["DRAIN_TIMEOUT_SECONDS"],
+    )
+    DrainingServer(config).run()
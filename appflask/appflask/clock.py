@@ -0,0 +1,72 @@
+"""Clock module for the Flask application.
+
+This module provides the clocks the rate limiter, the error handlers and the
+metrics read the time from. Applications use the system clock; tests pass a
+``ManualClock`` to ``create_app`` and move it forward to simulate the passing
+of rate limit windows without sleeping.
+"""
+from __future__ import annotations
+
+import time
+from typing import Protocol
+
+
+class Clock(Protocol):
+    """Source of the wall-clock and monotonic time of an application."""
+
+    def time(self) -> float:
+        """Return the wall-clock time in seconds since the epoch."""
+
+    def monotonic(self) -> float:
+        """Return a time in seconds that never goes backwards."""
+
+
+class SystemClock:
+    """Clock reading the system time."""
+
+    def time(self) -> float:
+        """Return the current time of the system."""
+        return time.time()
+
+    def monotonic(self) -> float:
+        """Return the value of the system monotonic clock."""
+        return time.monotonic()
+
+
+class ManualClock:
+    """Clock that only moves when told to.
+
+    It starts at the current system time, so rate limit entries it stamps are
+    never older than the real time the in-memory storage purges them by.
+
+    Attributes:
+        now: Current time of the clock in seconds since the epoch
+
+    """
+
+    def __init__(self, start: float | None = None) -> None:
+        """Start the clock at ``start``, or at the current system time."""
+        self.now = time.time() if start is None else start
+
+    def time(self) -> float:
+        """Return the current time of the clock."""
+        return self.now
+
+    def monotonic(self) -> float:
+        """Return the current time of the clock, which only moves forward."""
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        """Move the clock ``seconds`` forward.
+
+        Args:
+            seconds: Number of seconds to move forward
+
+        Raises:
+            ValueError: If ``seconds`` is negative
+
+        """
+        if seconds < 0:
+            msg = f"A clock cannot move backwards: {seconds}"
+            raise ValueError(msg)
+        self.now += seconds
@@ -0,0 +1,182 @@
+"""Response compression module for the Flask application.
+
+Responses are compressed with the best codec the client accepts in its
+``Accept-Encoding`` header: gzip always, and Brotli when the ``brotli``
+package is installed. Bodies under ``COMPRESSION_MIN_SIZE`` bytes are sent as
+they are, since the codec framing would outweigh the savings.
+
+Some bodies stay the same for a while: the greeting within its minute, the
+rate limit rejection for a given retry time, the overload response and a
+``/metrics`` snapshot. Their producers mark them stable, and their compressed
+form is kept in a small per-application cache, so they are compressed once
+rather than once per response.
+"""
+from __future__ import annotations
+
+import gzip
+import logging
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # Optional codec
+    brotli = None
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
+
+    from flask import Flask, Response
+
+logger = logging.getLogger(__name__)
+
+
+def gzip_compress(body: bytes, config: Mapping[str, Any]) -> bytes:
+    """Compress a body with gzip, without a timestamp so the output is stable."""
+    return gzip.compress(body, config["COMPRESSION_LEVEL"], mtime=0)
+
+def brotli_compress(body: bytes, config: Mapping[str, Any]) -> bytes:
+    """Compress a body with Brotli."""
+    return brotli.compress(body, quality=config["COMPRESSION_BROTLI_QUALITY"])
+
+
+# Available codecs by content coding, preferred first when the client weighs
+# several of them equally
+CODECS: dict[str, Callable[[bytes, Mapping[str, Any]], bytes]] = {}
+if brotli is not None:
+    CODECS["br"] = brotli_compress
+CODECS["gzip"] = gzip_compress
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Pick the codec of a response from the ``Accept-Encoding`` header.
+
+    Args:
+        accept_encoding: Value of the request header, possibly empty
+
+    Returns:
+        str | None: Content coding to use, or None to send the body as it is
+
+    """
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for coding in CODECS:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+def mark_stable(response: Response) -> Response:
+    """Mark a response whose body is shared by other responses for a while.
+
+    Args:
+        response: Response produced by a view or a handler
+
+    Returns:
+        Response: The same response, compressed through the cache
+
+    """
+    response.stable = True
+    return response
+
+
+class CompressionCache:
+    """Bounded LRU of the compressed forms of stable bodies.
+
+    Attributes:
+        size: Maximum number of compressed bodies kept
+        hits: Number of bodies served from the cache
+        misses: Number of bodies compressed and added to the cache
+
+    """
+
+    def __init__(self, size: int) -> None:
+        """Keep at most ``size`` compressed bodies."""
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compress(self, coding: str, body: bytes, config: Mapping[str, Any]) -> bytes:
+        """Return the compressed body, compressing it on its first use.
+
+        Args:
+            coding: Content coding of the response
+            body: Uncompressed body
+            config: Application configuration
+
+        Returns:
+            bytes: Compressed body
+
+        """
+        key = (coding, body)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = CODECS[coding](body, config)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = data
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return data
+
+
+def compress_response(response: Response) -> Response:
+    """Compress the response body if the client accepts a codec."""
+    config = current_app.settings
+    if (not config["COMPRESSION_ENABLED"]
+            or response.direct_passthrough or response.is_streamed
+            or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in config["COMPRESSION_MIMETYPES"]):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    coding = negotiate(request.headers.get("Accept-Encoding", ""))
+    body = response.get_data()
+    if coding is None or len(body) < config["COMPRESSION_MIN_SIZE"]:
+        return response
+
+    if getattr(response, "stable", False):
+        data = current_app.compression_cache.compress(coding, body, config)
+    else:
+        data = CODECS[coding](body, config)
+    if len(data) < len(body):
+        response.set_data(data)
+        response.headers["Content-Encoding"] = coding
+    return response
+
+def register_compression(app: Flask) -> None:
+    """Compress the responses of the application.
+
+    Must run right after the lanes are registered: Flask runs the
+    ``after_request`` hooks in reverse order, so the compression runs after
+    every hook but the lanes' one, and the lane latency still includes it.
+
+    Args:
+        app: Flask application instance
+
+    """
+    app.after_request(compress_response)
+    logger.debug("Response compression registered with codecs %s", list(CODECS))
@@ -0,0 +1,208 @@
+"""Adaptive concurrency limiting module for the Flask application.
+
+The fixed rate limit does not know how much traffic the pod can actually
+handle, which depends on the node it runs on. This module caps the number of
+requests in flight instead, and adapts the cap with AIMD (additive increase,
+multiplicative decrease) from the latency of the requests: while requests take
+about as long as the fastest ones seen recently the cap grows by the inverse
+of the cap per completed request, and when they slow down past the tolerated
+ratio the requests are queueing and the cap shrinks. Requests beyond the cap
+are shed with a precomputed 503 before the rate limiter or the view run.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import threading
+from typing import TYPE_CHECKING, Any
+
+from flask import Response, current_app, request
+
+from appflask.compression import mark_stable
+from appflask.lanes import is_priority_request
+from appflask.metrics import CONCURRENCY_LIMIT, REQUESTS_SHED
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from flask import Flask
+
+    from appflask.clock import Clock
+
+logger = logging.getLogger(__name__)
+
+# Requests after which the baseline latency is replaced by the fastest of
+# them, so the baseline can rise again after a faster period
+BASELINE_SAMPLES = 1000
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on the number of requests handled at once.
+
+    Attributes:
+        limit: Current limit, fractional so it can grow by less than one
+        in_flight: Number of requests admitted and not yet released
+        baseline: Shortest latency of the previous sampling period, in seconds
+
+    """
+
+    def __init__(self, config: Mapping[str, Any], clock: Clock) -> None:
+        """Start at the configured initial limit.
+
+        Args:
+            config: Application configuration
+            clock: Clock the latencies are measured with
+
+        """
+        self.clock = clock
+        self.limit = float(config["CONCURRENCY_INITIAL_LIMIT"])
+        self.in_flight = 0
+        self.baseline: float | None = None
+        self._period_min = math.inf
+        self._period_samples = 0
+        self._last_backoff = -math.inf
+        self._lock = threading.Lock()
+        self.configure(config)
+
+    def configure(self, config: Mapping[str, Any]) -> None:
+        """Apply the bounds and tuning of a configuration snapshot.
+
+        Args:
+            config: Application configuration
+
+        """
+        with self._lock:
+            self.min_limit = config["CONCURRENCY_MIN_LIMIT"]
+            self.max_limit = config["CONCURRENCY_MAX_LIMIT"]
+            self.backoff_ratio = config["CONCURRENCY_BACKOFF_RATIO"]
+            self.latency_tolerance = config["CONCURRENCY_LATENCY_TOLERANCE"]
+            self.limit = min(max(self.limit, self.min_limit), self.max_limit)
+        CONCURRENCY_LIMIT.set(int(self.limit))
+
+    def try_acquire(self) -> bool:
+        """Admit a request if the limit allows it.
+
+        Returns:
+            bool: True if the request was admitted and must be released
+
+        """
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: float | None) -> None:
+        """Release an admitted request and adapt the limit to its latency.
+
+        Args:
+            latency: Time the request took, or None to adapt nothing
+
+        """
+        with self._lock:
+            in_flight = self.in_flight
+            self.in_flight -= 1
+            if latency is None:
+                return
+            limit = self.limit
+
+            self._period_min = min(self._period_min, latency)
+            self._period_samples += 1
+            if self.baseline is None or self._period_samples >= BASELINE_SAMPLES:
+                self.baseline = self._period_min
+                self._period_min, self._period_samples = math.inf, 0
+
+            # Only a limit in use says something about the capacity
+            if in_flight * 2 < limit:
+                return
+
+            now = self.clock.monotonic()
+            if latency > self.baseline * self.latency_tolerance:
+                # Back off once per round: the other slow requests of this
+                # round report the same congestion
+                if now - self._last_backoff >= latency:
+                    self._last_backoff = now
+                    self.limit = max(self.min_limit, limit * self.backoff_ratio)
+            else:
+                self.limit = min(self.max_limit, limit + 1 / limit)
+
+        if int(self.limit) != int(limit):
+            CONCURRENCY_LIMIT.set(int(self.limit))
+
+
+def build_overload_response(config: Mapping[str, Any]) -> tuple[bytes, dict[str, str]]:
+    """Precompute the body and headers of the response to shed requests.
+
+    Args:
+        config: Application configuration
+
+    Returns:
+        tuple: JSON body and response headers
+
+    """
+    retry = config["OVERLOAD_RETRY_SECONDS"]
+    body = json.dumps({
+        "code": config["OVERLOAD_CODE"],
+        "error": config["OVERLOAD_MESSAGE"],
+        "message": "The server is handling too many requests. "
+                   f"Please try again in {retry} second{'s' if retry != 1 else ''}.",
+        "retry_after": retry,
+    }).encode()
+    return body, {"Content-Type": "application/json", "Retry-After": str(retry)}
+
+def admit_request() -> Response | None:
+    """Shed the request if the concurrency limit is reached.
+
+    Priority lane requests have threads of their own and are never shed.
+    """
+    if (not current_app.settings["CONCURRENCY_LIMIT_ENABLED"]
+            or is_priority_request()):
+        return None
+
+    limiter = current_app.concurrency_limiter
+    if not limiter.try_acquire():
+        REQUESTS_SHED.inc()
+        request.shed = True
+        body, headers = current_app.overload_response
+        return mark_stable(
+            Response(body, current_app.settings["OVERLOAD_CODE"], headers),
+        )
+
+    request.concurrency_start = limiter.clock.monotonic()
+    return None
+
+def record_latency(response: Response) -> Response:
+    """Measure the time an admitted request took to produce its response.
+
+    Streamed bodies are left out, so a long stream does not read as a slow
+    request; the stream keeps its slot until it ends.
+    """
+    start = getattr(request, "concurrency_start", None)
+    if start is not None:
+        clock = current_app.concurrency_limiter.clock
+        request.concurrency_latency = clock.monotonic() - start
+    return response
+
+def release_request(exc: BaseException | None) -> None:  # noqa: ARG001
+    """Release the slot of an admitted request once it is torn down."""
+    if getattr(request, "concurrency_start", None) is not None:
+        current_app.concurrency_limiter.release(
+            getattr(request, "concurrency_latency", None),
+        )
+
+def register_load_shedding(app: Flask) -> None:
+    """Create the concurrency limiter and shed requests beyond it.
+
+    Must run before the rate limiter is created, so shed requests are
+    rejected before they are counted against the rate limit.
+
+    Args:
+        app: Flask application instance
+
+    """
+    app.concurrency_limiter = AdaptiveConcurrencyLimiter(app.settings, app.clock)
+    app.before_request(admit_request)
+    app.after_request(record_latency)
+    app.teardown_request(release_request)
+    logger.debug("Load shedding registered")
@@ -1,11 +1,21 @@
 """Configuration module for the Flask application.
 
 This module defines various configuration classes for different environments
-and provides a function to retrieve the active configuration.
+and resolves the active one, once, into an immutable snapshot: class defaults,
+then environment variable overrides, then the optional JSON file named by
+``APPFLASK_CONFIG_FILE``. Re-resolving the snapshot picks up edits to that file
+without a restart (see ``appflask.reload``).
 """
+from __future__ import annotations
 
+import json
 import os
-from typing import Any
+from pathlib import Path
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
 
 
 class Config:
@@ -31,17 +41,89 @@ class Config:
     )
     RATELIMIT_HEADERS_ENABLED = True
 
+    # Adaptive concurrency limit, shedding requests beyond it with a 503
+    CONCURRENCY_LIMIT_ENABLED = True
+    CONCURRENCY_INITIAL_LIMIT = 20
+    CONCURRENCY_MIN_LIMIT = 4
+    CONCURRENCY_MAX_LIMIT = 200
+    CONCURRENCY_BACKOFF_RATIO = 0.9  # Limit kept when requests slow down
+    CONCURRENCY_LATENCY_TOLERANCE = 2.0  # Slowdown over the baseline latency
+    OVERLOAD_CODE = 503
+    OVERLOAD_RETRY_SECONDS = 1
+    OVERLOAD_MESSAGE = "Service overloaded."
+
+    # Priority lane: probes and scrapes, exempt from the rate limit and load
+    # shedding, with threads of their own in the pre-fork and ASGI servers
+    PRIORITY_PATHS = ("/health", "/ready", "/metrics")
+
+    # Response compression, negotiated from Accept-Encoding
+    COMPRESSION_ENABLED = True
+    COMPRESSION_LEVEL = 6  # gzip level, 1 (fastest) to 9 (smallest)
+    COMPRESSION_BROTLI_QUALITY = 5  # Brotli quality, 0 to 11, if installed
+    COMPRESSION_MIN_SIZE = 128  # Smaller bodies are sent as they are
+    COMPRESSION_MIMETYPES = ("application/json", "text/plain")
+    COMPRESSION_CACHE_SIZE = 64  # Compressed stable bodies kept
+
+    # Batch and streaming API configuration
+    BATCH_MAX_QUERIES = 50
+    BATCH_REQUEST_COST = 1  # Limiter hits charged for one batch or stream call
+    STREAM_INTERVAL_SECONDS = 5
+    STREAM_MAX_UPDATES = 120
+
+    # Logging configuration
+    LOG_LEVEL = "INFO"
+    LOG_FORMAT = "text"  # text or json
+    LOG_QUEUE_SIZE = 10000  # Records waiting for the listener before dropping
+    LOG_SAMPLE_INTERVAL_SECONDS = 1.0  # 0 writes every record
+    LOG_SAMPLED_LOGGERS = ("appflask.errors", "flask-limiter")
+
+    # Metrics configuration
+    METRICS_ENABLED = True  # Record request metrics
+    METRICS_EXCLUDED_ENDPOINTS = ("metrics",)  # Endpoints never recorded
+    METRICS_SNAPSHOT_SECONDS = 0.0  # Scrapes within it share a snapshot
+
+    # Run synthetic requests through every route before reporting ready
+    WARMUP_ENABLED = True
+
+    # Server configuration
+    SERVER_MODE = "wsgi"  # wsgi, asgi or prefork
+    SERVER_WORKERS = 1
+    SERVER_THREADS = 8
+    SERVER_PRIORITY_THREADS = 2  # Reserved for the priority lane, per worker
+    SERVER_MAX_REQUESTS = 0  # 0 = never recycle
+    SERVER_MAX_REQUESTS_JITTER = 0
+    SERVER_GRACEFUL_TIMEOUT = 30
+    # Seconds in-flight requests get after SIGTERM; below the graceful timeout
+    # and the termination grace period of the pod, so the logs are flushed
+    DRAIN_TIMEOUT_SECONDS = 20
+
+    # Limiter state written periodically and restored on startup; "" disables
+    LIMITER_SNAPSHOT_PATH = ""
+    LIMITER_SNAPSHOT_INTERVAL_SECONDS = 1.0
+
+    # ASGI server configuration
+    ASGI_MAX_WORKERS = 32  # Threads running requests, not connections
+    ASGI_PRIORITY_WORKERS = 2  # Threads reserved for the priority lane
+    ASGI_BACKLOG = 2048
+    ASGI_KEEP_ALIVE_SECONDS = 30
+
     @classmethod
     def to_dict(cls) -> dict[str, Any]:
-        """Convert config to dictionary for Flask configuration."""
-        return {key: getattr(cls, key) for key in dir(cls)
-                if key.isupper() and not key.startswith("_")}
+        """Convert the class defaults to a dictionary, without any override."""
+        values: dict[str, Any] = {}
+        for klass in reversed(cls.__mro__):
+            values.update(
+                (key, value) for key, value in vars(klass).items()
+                if key.isupper() and not key.startswith("_")
+            )
+        return values
 
 
 class DevelopmentConfig(Config):
     """Development environment configuration."""
 
     DEBUG = True
+    LOG_LEVEL = "DEBUG"
 
 
 class TestingConfig(Config):
@@ -55,6 +137,9 @@ class ProductionConfig(Config):
     """Production environment configuration."""
     # For production, we'll still use in-memory storage
 
+    # Scrapers polling within a second share one compressed snapshot
+    METRICS_SNAPSHOT_SECONDS = 1.0
+
 
 # Configuration dictionary based on environment
 config_by_name = {
@@ -64,8 +149,86 @@ config_by_name = {
     "default": DevelopmentConfig,
 }
 
+# Environment variables overriding configuration keys
+ENV_OVERRIDES = {
+    "RATE_LIMIT_REQUESTS_PER_MINUTE": "APPFLASK_RATE_LIMIT",
+    "LOG_LEVEL": "APPFLASK_LOG_LEVEL",
+    "LOG_FORMAT": "APPFLASK_LOG_FORMAT",
+    "WARMUP_ENABLED": "APPFLASK_WARMUP",
+    "CONCURRENCY_LIMIT_ENABLED": "APPFLASK_CONCURRENCY_LIMIT",
+    "COMPRESSION_ENABLED": "APPFLASK_COMPRESSION",
+    "LIMITER_SNAPSHOT_PATH": "APPFLASK_LIMITER_SNAPSHOT",
+    "SERVER_MODE": "APPFLASK_SERVER",
+    "SERVER_WORKERS": "APPFLASK_WORKERS",
+    "SERVER_THREADS": "APPFLASK_THREADS",
+    "SERVER_MAX_REQUESTS": "APPFLASK_MAX_REQUESTS",
+    "SERVER_MAX_REQUESTS_JITTER": "APPFLASK_MAX_REQUESTS_JITTER",
+}
+
+# Environment variable naming a JSON file of configuration overrides
+CONFIG_FILE_ENV = "APPFLASK_CONFIG_FILE"
+
 # Get active configuration
-def get_config() -> Config:
+def get_config() -> type[Config]:
     """Get configuration based on environment variable."""
     env = os.getenv("FLASK_ENV", "default")
     return config_by_name[env]
+
+def coerce(value: Any, default: Any) -> Any:  # noqa: ANN401
+    """Convert an override to the type of the default it replaces.
+
+    Args:
+        value: Override read from the environment or the config file
+        default: Class default of the same key
+
+    Returns:
+        Any: The override with the type of ``default``
+
+    """
+    if isinstance(default, bool):
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        return bool(value)
+    if isinstance(default, tuple):
+        if isinstance(value, str):
+            return tuple(item.strip() for item in value.split(",") if item.strip())
+        return tuple(value)
+    if isinstance(default, (int, float, str)):
+        return type(default)(value)
+    return value
+
+def resolve_config(env: str | None = None) -> Mapping[str, Any]:
+    """Resolve the active configuration into an immutable snapshot.
+
+    Args:
+        env: Configuration name, defaults to the ``FLASK_ENV`` variable
+
+    Returns:
+        Mapping: Read-only view of the resolved configuration
+
+    Raises:
+        ValueError: If the config file sets an unknown key or an invalid value
+
+    """
+    config_class = config_by_name[env or os.getenv("FLASK_ENV", "default")]
+    values = config_class.to_dict()
+
+    for key, variable in ENV_OVERRIDES.items():
+        if variable in os.environ:
+            values[key] = coerce(os.environ[variable], values[key])
+
+    config_file = os.getenv(CONFIG_FILE_ENV)
+    if config_file:
+        overrides = json.loads(Path(config_file).read_text())
+        for key, value in overrides.items():
+            if key not in values:
+                msg = f"Unknown configuration key {key!r} in {config_file}"
+                raise ValueError(msg)
+            values[key] = coerce(value, values[key])
+
+    # Keep the derived limit string in line with its overridden parts
+    values["RATELIMIT_DEFAULT"] = (
+        f"{values['RATE_LIMIT_REQUESTS_PER_MINUTE']} per "
+        f"{values['RATE_LIMIT_DEFAULT_RETRY']} seconds"
+    )
+    return MappingProxyType(values)
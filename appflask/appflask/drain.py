@@ -0,0 +1,92 @@
+"""Graceful drain module for the Flask application.
+
+On ``SIGTERM`` the readiness probe starts failing and the server stops
+accepting connections, while the requests already in flight run to their
+end, until ``DRAIN_TIMEOUT_SECONDS`` after the signal. Requests still running
+at that deadline are dropped when the process exits. The drain duration and
+the dropped requests are reported as metrics and in the log, a last limiter
+snapshot is written, and the logging queue is written out at exit.
+
+Exiting without a drain resets the requests in flight during rolling
+updates, and their clients retry on the remaining pods, where the retries
+spend the rate limit of other clients.
+"""
+from __future__ import annotations
+
+import logging
+import signal
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from appflask.metrics import DRAIN_DURATION, REQUESTS_DROPPED
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from types import FrameType
+
+    from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+
+def begin_drain(app: Flask) -> None:
+    """Fail the readiness probe of the application from now on.
+
+    Safe to call from a signal handler: it neither logs nor blocks.
+
+    Args:
+        app: Flask application to drain
+
+    """
+    if app.drain_started is None:
+        app.drain_started = time.monotonic()
+    app.ready.clear()
+
+def finish_drain(app: Flask, wait: Callable[[float], int] | None = None) -> int:
+    """Wait for the requests in flight until the drain deadline and report them.
+
+    The deadline runs in real time from ``begin_drain``, or from now if the
+    server stopped on its own, as when a worker is recycled.
+
+    Args:
+        app: Flask application being drained
+        wait: Function waiting at most the given seconds for the requests and
+            returning how many are left; defaults to waiting for the
+            in-flight requests of the application
+
+    Returns:
+        int: Number of requests dropped at the deadline
+
+    """
+    started = app.drain_started or time.monotonic()
+    deadline = started + app.settings["DRAIN_TIMEOUT_SECONDS"]
+    wait = wait or app.in_flight.wait_idle
+    dropped = wait(max(0.0, deadline - time.monotonic()))
+
+    duration = time.monotonic() - started
+    DRAIN_DURATION.set(duration)
+    REQUESTS_DROPPED.inc(dropped)
+    if dropped:
+        logger.warning("Drain deadline reached after %.3fs, dropping %d requests",
+                       duration, dropped)
+    else:
+        logger.info("Drained in %.3fs", duration)
+    # The last requests are counted, so the next process starts from them
+    app.limiter_snapshots.stop()
+    return dropped
+
+def install_drain_handler(app: Flask, stop: Callable[[], None]) -> None:
+    """Drain the application on ``SIGTERM``.
+
+    Args:
+        app: Flask application to drain
+        stop: Function stopping the server from accepting connections; it is
+            called from a thread of its own, so it may block
+
+    """
+    def handle_drain(signum: int, frame: FrameType | None) -> None:  # noqa: ARG001
+        begin_drain(app)
+        threading.Thread(target=stop, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_drain)
@@ -5,30 +5,22 @@ This module defines custom error handlers for rate limiting and other errors.
 from __future__ import annotations
 
 import logging
-import time
-from typing import TypeVar
+import threading
+from typing import TYPE_CHECKING, Any, TypeVar
 
-from flask import Flask, Response, jsonify, make_response
+from flask import Flask, Response, current_app, jsonify, make_response, request
 
-from appflask.config import get_config
+from appflask.compression import mark_stable
+from appflask.warmup import WARMUP_ENVIRON_KEY
 
-# Get application configuration
-config = get_config()
-
-# Access constants from config
-RATE_LIMIT_CODE = config.RATE_LIMIT_CODE
-RATE_LIMIT_DEFAULT_RETRY = config.RATE_LIMIT_DEFAULT_RETRY
-RATE_LIMIT_MESSAGE = config.RATE_LIMIT_MESSAGE
-RATE_LIMIT_REQUESTS_PER_MINUTE = config.RATE_LIMIT_REQUESTS_PER_MINUTE
+if TYPE_CHECKING:
+    from collections.abc import Mapping
 
 logger = logging.getLogger(__name__)
 
 # Define a type for rate limit exceptions
 ExceptionType = TypeVar("ExceptionType")
 
-# A single global timestamp to track when the rate limit was first hit
-global_rate_limit_timestamp = None
-
 # Define a constant for seconds in a minute
 SECONDS_IN_MINUTE = 60
 
@@ -60,6 +52,59 @@ def format_retry_time(retry_after: str | int) -> str:
     # If it's a timestamp or unparseable
     return "some time"
 
+class RateLimitWindow:
+    """Global rate limit window of an application, started by its first rejection.
+
+    Attributes:
+        started_at: Time the rate limit was first hit, or None outside a window
+
+    """
+
+    def __init__(self) -> None:
+        """Start outside of any window."""
+        self.started_at: int | None = None
+        self._lock = threading.Lock()
+
+    def retry_seconds(self, now: int, window_seconds: int) -> int:
+        """Return the seconds left in the window, starting one if needed.
+
+        Args:
+            now: Current time in whole seconds
+            window_seconds: Length of the window in seconds
+
+        Returns:
+            int: Seconds before a retry, at least 1
+
+        """
+        with self._lock:
+            # If this is the first time the rate limit has been hit, store the time
+            if self.started_at is None:
+                self.started_at = now
+                logger.debug("New global rate limit at timestamp %s", now)
+            start_time = self.started_at
+
+            # Calculate remaining time in the window
+            elapsed_seconds = now - start_time
+            retry_seconds = max(1, window_seconds - elapsed_seconds)
+
+            # Forget the window once it is more than twice as old as its length
+            # This prevents issues if the handler logic has flaws
+            if elapsed_seconds > 2 * window_seconds:
+                self.started_at = None
+
+        logger.debug(
+            "Rate limit: started at %s, elapsed %ss, remaining %ss",
+            start_time,
+            elapsed_seconds,
+            retry_seconds,
+        )
+        return retry_seconds
+
+    def reset(self) -> None:
+        """Forget the start of the current window."""
+        with self._lock:
+            self.started_at = None
+
 def ratelimit_handler(e: ExceptionType) -> Response:
     """Handle rate limiting errors with a global 60-second window from first hit.
 
@@ -70,72 +115,57 @@ def ratelimit_handler(e: ExceptionType) -> Response:
         Response: A properly formatted error response with accurate time remaining
 
     """
-    # We need to use a module-level variable to track the rate limit timestamp
-    # ruff: noqa: PLW0603
-    global global_rate_limit_timestamp
-    current_time = int(time.time())
-
-    # Log the rate limit event
-    logger.warning("Global rate limit exceeded: %s", e)
-
-    # If this is the first time the global rate limit has been hit, store the timestamp
-    if global_rate_limit_timestamp is None:
-        global_rate_limit_timestamp = current_time
-        logger.debug("New global rate limit at timestamp %s", current_time)
-
-    # Calculate how much time remains in the 60-second window
-    start_time = global_rate_limit_timestamp
-    elapsed_seconds = current_time - start_time
-    window_seconds = RATE_LIMIT_DEFAULT_RETRY  # The total window size in seconds
-
-    # Calculate remaining time in the window
-    retry_seconds = max(1, window_seconds - elapsed_seconds)
-
-    logger.debug(
-        "Rate limit: started at %s, elapsed %ss, remaining %ss",
-        start_time,
-        elapsed_seconds,
-        retry_seconds,
+    # Read the rate limit settings of the application handling the request
+    config = current_app.settings
+    rate_limit_code = config["RATE_LIMIT_CODE"]
+    rate_limit_default_retry = config["RATE_LIMIT_DEFAULT_RETRY"]
+
+    # Log the rate limit event, unless it is the one simulated during warmup
+    if WARMUP_ENVIRON_KEY not in request.environ:
+        logger.warning("Global rate limit exceeded: %s", e)
+
+    # Calculate how much time remains in the window of this application
+    retry_seconds = current_app.rate_limit_window.retry_seconds(
+        int(current_app.clock.time()), rate_limit_default_retry,
     )
 
-    # If the window has expired, this shouldn't happen but just in case
-    if retry_seconds <= 0:
-        # Reset the timestamp and allow the request
-        logger.debug("Window expired, but still hitting handler. Resetting.")
-        global_rate_limit_timestamp = None
-        retry_seconds = 1  # Minimal fallback
-
-    # Format retry time for user-friendly message
-    time_msg = format_retry_time(retry_seconds)
-
-    # Create the message with string concatenation to avoid f-string with long line
-    message = (
-        f"The API has exceeded the allowed {RATE_LIMIT_REQUESTS_PER_MINUTE} "
-        f"requests per 60 seconds. Please try again in {time_msg}."
-    )
+    # Look up the message precomputed for this retry time
+    messages = current_app.rate_limit_messages
+    message = messages[min(retry_seconds, len(messages) - 1)]
 
     # Create and return the response
     response = make_response(
         jsonify(
-            code=RATE_LIMIT_CODE,
-            error=RATE_LIMIT_MESSAGE,
+            code=rate_limit_code,
+            error=config["RATE_LIMIT_MESSAGE"],
             message=message,
             retry_after=retry_seconds,
         ),
-        RATE_LIMIT_CODE,
+        rate_limit_code,
     )
 
     # Ensure we set the Retry-After header ourselves
     response.headers["Retry-After"] = str(retry_seconds)
 
-    # Reset the global rate limit timestamp if it's been more than double the window
-    # This prevents issues if the handler logic has flaws
-    double_window = 2 * RATE_LIMIT_DEFAULT_RETRY
-    if (global_rate_limit_timestamp is not None and
-            (current_time - global_rate_limit_timestamp) > double_window):
-        global_rate_limit_timestamp = None
+    # Every rejection with the same retry time has the same body
+    return mark_stable(response)
+
+def build_rate_limit_messages(config: Mapping[str, Any]) -> tuple[str, ...]:
+    """Precompute the rate limit message for every possible retry time.
+
+    Args:
+        config: Application configuration
+
+    Returns:
+        tuple: Messages indexed by the number of seconds before a retry
 
-    return response
+    """
+    requests_per_minute = config["RATE_LIMIT_REQUESTS_PER_MINUTE"]
+    return tuple(
+        f"The API has exceeded the allowed {requests_per_minute} "
+        f"requests per 60 seconds. Please try again in {format_retry_time(seconds)}."
+        for seconds in range(config["RATE_LIMIT_DEFAULT_RETRY"] + 1)
+    )
 
 def register_error_handlers(app: Flask) -> None:
     """Register all error handlers for the application.
@@ -144,8 +174,9 @@ def register_error_handlers(app: Flask) -> None:
         app: Flask application instance
 
     """
-    # Register rate limit error handler
-    app.errorhandler(RATE_LIMIT_CODE)(ratelimit_handler)
+    # Register rate limit error handler, with the window state of this application
+    app.rate_limit_window = RateLimitWindow()
+    app.errorhandler(app.config["RATE_LIMIT_CODE"])(ratelimit_handler)
 
     # Add more error handlers here as needed
     logger.debug("Error handlers registered successfully")
@@ -0,0 +1,115 @@
+"""Priority lanes module for the Flask application.
+
+Requests are classified by path into two lanes. The priority lane holds the
+Kubernetes probes and the metrics scrapes; the user lane holds everything
+else. Priority requests are exempt from the rate limit and from load
+shedding, and the pre-fork and ASGI servers run them on threads reserved for
+them, so an overloaded pod still answers its probes instead of being
+restarted, which would only move its load onto the other pods. Each lane has
+its own latency and admission metrics.
+"""
+from __future__ import annotations
+
+import logging
+import socket
+from typing import TYPE_CHECKING, Any
+
+from flask import current_app, request
+
+from appflask.metrics import LANE_LATENCY, LANE_REQUESTS
+from appflask.warmup import WARMUP_ENVIRON_KEY
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from flask import Flask, Response
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_LANE = "priority"
+USER_LANE = "user"
+
+# Bytes of a new connection read ahead to find the request path
+PEEK_BYTES = 1024
+
+
+def classify(path: str, config: Mapping[str, Any]) -> str:
+    """Return the lane of a request path.
+
+    Args:
+        path: Request path, without the query string
+        config: Application configuration
+
+    Returns:
+        str: ``PRIORITY_LANE`` or ``USER_LANE``
+
+    """
+    return PRIORITY_LANE if path in config["PRIORITY_PATHS"] else USER_LANE
+
+def peek_path(connection: socket.socket) -> str | None:
+    """Return the path of the request waiting on a new connection, if it arrived.
+
+    The bytes are left in the socket for the request handler, and the call
+    never waits: a request line still in transit reads as unknown.
+
+    Args:
+        connection: Accepted client connection
+
+    Returns:
+        str | None: Request path, or None if the request line is not there yet
+
+    """
+    try:
+        data = connection.recv(PEEK_BYTES, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+    except OSError:
+        return None
+    request_line, newline, _ = data.partition(b"\r\n")
+    parts = request_line.split(b" ")
+    if not newline or len(parts) != 3:  # noqa: PLR2004
+        return None
+    return parts[1].split(b"?", 1)[0].decode("latin1")
+
+def is_priority_request() -> bool:
+    """Return whether the current request belongs to the priority lane."""
+    return classify(request.path, current_app.settings) == PRIORITY_LANE
+
+def start_lane() -> None:
+    """Classify the request and note when it started."""
+    request.lane = classify(request.path, current_app.settings)
+    request.lane_start = current_app.clock.monotonic()
+
+def record_lane(response: Response) -> Response:
+    """Record the latency and the admission outcome of the request in its lane."""
+    config = current_app.settings
+    if (config["METRICS_ENABLED"] and hasattr(request, "lane")
+            and WARMUP_ENVIRON_KEY not in request.environ):
+        if getattr(request, "shed", False):
+            outcome = "shed"
+        elif response.status_code == config["RATE_LIMIT_CODE"]:
+            outcome = "rate_limited"
+        else:
+            outcome = "admitted"
+        LANE_REQUESTS.labels(lane=request.lane, outcome=outcome).inc()
+        LANE_LATENCY.labels(lane=request.lane).observe(
+            current_app.clock.monotonic() - request.lane_start,
+        )
+    return response
+
+def register_lanes(app: Flask) -> None:
+    """Classify every request into its lane and record the lane metrics.
+
+    Must run before the other request hooks are registered, so the latency
+    covers the whole request, including a rejection by the load shedding or
+    the rate limiter.
+
+    Args:
+        app: Flask application instance
+
+    """
+    app.before_request(start_lane)
+    app.after_request(record_lane)
+    for lane in (PRIORITY_LANE, USER_LANE):
+        LANE_LATENCY.labels(lane=lane)
+        for outcome in ("admitted", "shed", "rate_limited"):
+            LANE_REQUESTS.labels(lane=lane, outcome=outcome)
+    logger.debug("Priority lanes registered")
@@ -1,22 +1,141 @@
 """Rate limiting module for the Flask application.
 
 This module provides a factory for creating rate limiters and a global key function
-for implementing application-wide rate limiting.
+for implementing application-wide rate limiting. In-memory counters follow
+the clock of the application, so tests can move time forward instead of waiting.
 """
 from __future__ import annotations
 
-import logging
-from typing import TYPE_CHECKING
+import inspect
+import types
+from typing import TYPE_CHECKING, Any
 
+from flask import current_app, request
 from flask_limiter import Limiter
+from limits import parse
+from limits.storage import MemoryStorage, memory
 
-from appflask.config import get_config
+from appflask.clock import SystemClock
+from appflask.config import resolve_config
+from appflask.lanes import is_priority_request
+from appflask.warmup import WARMUP_ENVIRON_KEY, WARMUP_REJECT
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
+
     from flask import Flask
 
-# Get application configuration
-config = get_config()
+    from appflask.clock import Clock
+
+# Endpoints that answer several queries per call and are charged as a batch
+BATCH_ENDPOINTS = frozenset({"main.batch", "main.stream"})
+
+# Storage scheme of the in-memory storage following the application clock
+CLOCKED_MEMORY_SCHEME = "clocked-memory"
+
+def with_globals(func: Callable, namespace: dict[str, Any]) -> Callable:
+    """Return a copy of ``func`` resolving its global names in ``namespace``."""
+    return types.FunctionType(
+        func.__code__, namespace, func.__name__, func.__defaults__, func.__closure__,
+    )
+
+class ClockedMemoryStorage(MemoryStorage):
+    """In-memory limiter storage reading the time from an application clock.
+
+    ``MemoryStorage`` calls ``time.time()`` on the ``time`` module, so each
+    instance rebinds the methods doing so to a namespace where ``time`` is its
+    clock. Every strategy, and the purge of expired entries, then follow the
+    clock, and two applications with their own clocks do not interfere. The
+    rebound methods skip the storage error wrapping of ``limits``, which
+    in-memory storage never needs.
+
+    Attributes:
+        clock: Clock the storage reads the time from
+
+    """
+
+    STORAGE_SCHEME = [CLOCKED_MEMORY_SCHEME]
+
+    def __init__(self, uri: str | None = None, clock: Clock | None = None,
+                 **options: Any) -> None:  # noqa: ANN401
+        """Create the storage, reading the time from ``clock``."""
+        self.clock = clock or SystemClock()
+        namespace = {**vars(memory), "time": self.clock}
+        namespace["Entry"] = type("Entry", (memory.Entry,), {
+            "__init__": with_globals(memory.Entry.__init__, namespace),
+        })
+        # Bound before the parent starts its purge timer on one of them
+        for name, method in vars(MemoryStorage).items():
+            func = inspect.unwrap(method)
+            if isinstance(func, types.FunctionType) and "time" in func.__code__.co_names:
+                setattr(self, name, types.MethodType(with_globals(func, namespace), self))
+        super().__init__(uri, **options)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the state of the storage in a compact, JSON-ready form.
+
+        Times are stored as whole milliseconds before ``taken_at``, and the
+        moving-window entries of a key as ``[age, count]`` runs, since a
+        request costing several hits adds the same entry several times.
+
+        Returns:
+            dict: Time of the snapshot, window entries and counters by key
+
+        """
+        now = self.clock.time()
+        events = {}
+        for key, entries in list(self.events.items()):
+            runs: list[list[int]] = []
+            for entry in list(entries):
+                age = round((now - entry.atime) * 1000)
+                if runs and runs[-1][0] == age:
+                    runs[-1][1] += 1
+                else:
+                    runs.append([age, 1])
+            if runs:
+                events[key] = [round(entries[0].expiry - entries[0].atime), runs]
+        counters = {
+            key: [count, round((self.expirations.get(key, now) - now) * 1000)]
+            for key, count in list(self.storage.items())
+        }
+        return {"taken_at": now, "events": events, "counters": counters}
+
+    def restore(self, state: Mapping[str, Any]) -> int:
+        """Replace the state of the storage with a snapshot.
+
+        Entries and counters keep the time they were created at, so those
+        that expired while the process was down are left out, and the others
+        expire as if the process had never stopped.
+
+        Args:
+            state: Snapshot returned by ``snapshot``
+
+        Returns:
+            int: Number of moving-window entries and counters restored
+
+        """
+        now = self.clock.time()
+        taken_at = state["taken_at"]
+        self.reset()
+        restored = 0
+        for key, (window, runs) in state["events"].items():
+            entries = []
+            for age, count in runs:
+                entry = memory.Entry.__new__(memory.Entry)
+                entry.atime = taken_at - age / 1000
+                entry.expiry = entry.atime + window
+                if entry.expiry > now:
+                    entries += [entry] * count
+            if entries:
+                self.events[key] = entries
+                restored += len(entries)
+        for key, (count, expires_in) in state["counters"].items():
+            expiry = taken_at + expires_in / 1000
+            if expiry > now:
+                self.storage[key] = count
+                self.expirations[key] = expiry
+                restored += 1
+        return restored
 
 def global_key_func() -> str:
     """Return a static key for all requests to create a global rate limit.
@@ -27,6 +146,112 @@ def global_key_func() -> str:
     """
     return "global"
 
+def request_cost() -> int:
+    """Return the number of limiter hits charged to the current request.
+
+    Batch and streaming calls answer several queries at once, so they are
+    charged the configured batch cost instead of one hit per query.
+
+    Returns:
+        int: Cost of the current request against the rate limit
+
+    """
+    warmup = request.environ.get(WARMUP_ENVIRON_KEY)
+    if warmup:
+        # Warmup requests are free, except the one simulating a rejection
+        if warmup == WARMUP_REJECT:
+            return current_app.settings["RATE_LIMIT_REQUESTS_PER_MINUTE"] + 1
+        return 0
+
+    if request.endpoint in BATCH_ENDPOINTS:
+        return current_app.settings["BATCH_REQUEST_COST"]
+    return 1
+
+def worker_processes(config: Mapping[str, Any]) -> int:
+    """Return the number of processes serving requests side by side.
+
+    Args:
+        config: Application configuration
+
+    Returns:
+        int: Number of pre-forked workers, or 1 for single-process servers
+
+    """
+    if config["SERVER_MODE"] == "prefork":
+        return max(1, config["SERVER_WORKERS"])
+    return 1
+
+def limit_string(config: Mapping[str, Any]) -> str:
+    """Return the rate limit enforced by this process.
+
+    In-memory storage is private to each pre-forked worker, so the global
+    budget is split between the workers to keep the same overall limit.
+
+    Args:
+        config: Application configuration
+
+    Returns:
+        str: Rate limit in the flask-limiter string notation
+
+    """
+    requests_per_minute = config["RATE_LIMIT_REQUESTS_PER_MINUTE"]
+    workers = worker_processes(config)
+    if workers > 1 and config["RATELIMIT_STORAGE_URI"].startswith("memory://"):
+        requests_per_minute = -(-requests_per_minute // workers)
+
+    # Create a true 60-second window
+    return f"{requests_per_minute} per {config['RATE_LIMIT_DEFAULT_RETRY']} seconds"
+
+class DynamicLimit:
+    """Rate limit provider whose limit can be swapped while serving.
+
+    flask-limiter calls the provider on every request, so assigning ``value``
+    applies a new limit to the next request without rebuilding the limiter.
+
+    Attributes:
+        value: Current rate limit in the flask-limiter string notation
+
+    """
+
+    def __init__(self, value: str) -> None:
+        """Start with the limit ``value``."""
+        self.value = value
+
+    def __call__(self) -> str:
+        """Return the current limit."""
+        return self.value
+
+def carry_over_counters(limiter: Limiter, old: str, new: str) -> int:
+    """Move the in-memory counters of a replaced limit to the new limit.
+
+    Storage keys include the limit amount, so without this step a new limit
+    would start from an empty window. Counters in shared storage are left in
+    place and expire on their own.
+
+    Args:
+        limiter: Limiter whose storage holds the counters
+        old: Previous rate limit string
+        new: New rate limit string
+
+    Returns:
+        int: Number of storage keys moved
+
+    """
+    storage = limiter.storage
+    old_item, new_item = parse(old), parse(new)
+    if (not isinstance(storage, MemoryStorage)
+            or old_item.get_expiry() != new_item.get_expiry()):
+        return 0
+
+    old_suffix = old_item.key_for()[len(old_item.namespace):]
+    new_suffix = new_item.key_for()[len(new_item.namespace):]
+    moved = 0
+    for table in (storage.events, storage.storage, storage.expirations):
+        for key in [key for key in table if key.endswith(old_suffix)]:
+            table[key[:-len(old_suffix)] + new_suffix] = table.pop(key)
+            moved += 1
+    return moved
+
 class RateLimiterFactory:
     """Factory for creating and configuring rate limiters."""
 
@@ -41,14 +266,16 @@ class RateLimiterFactory:
             Limiter: Configured limiter instance
 
         """
-        # Use the constant from config to ensure consistency
-        requests_per_minute = config.RATE_LIMIT_REQUESTS_PER_MINUTE
-        rate_limit_default_retry = config.RATE_LIMIT_DEFAULT_RETRY
+        # Use the application configuration, or the active one without an app
+        config = app.settings if app is not None else resolve_config()
+        default_limit = DynamicLimit(limit_string(config))
 
-        # Create a true 60-second window
-        default_limit = (
-            f"{requests_per_minute} per {rate_limit_default_retry} seconds"
-        )
+        # Keep in-memory counters on the application clock
+        storage_uri = config["RATELIMIT_STORAGE_URI"]
+        storage_options = {}
+        if storage_uri.startswith("memory://"):
+            storage_uri = CLOCKED_MEMORY_SCHEME + storage_uri[len("memory"):]
+            storage_options["clock"] = app.clock if app is not None else SystemClock()
 
         # Create the limiter with global application defaults
         limiter = Limiter(
@@ -57,14 +284,19 @@ class RateLimiterFactory:
             app=app,
             default_limits=[default_limit],
             application_limits=[default_limit],  # This applies globally
-            storage_uri="memory://",
-            strategy="moving-window",
+            default_limits_cost=request_cost,
+            application_limits_cost=request_cost,
+            storage_uri=storage_uri,
+            storage_options=storage_options,
+            strategy=config["RATELIMIT_STRATEGY"],
             headers_enabled=True,
             retry_after="delta-seconds",
         )
 
-        # Configure logging for rate limiter
-        logger = logging.getLogger("flask-limiter")
-        logger.setLevel(logging.DEBUG)
+        # Keep the provider reachable so a configuration reload can swap it
+        limiter.dynamic_limit = default_limit
+
+        # Probes and scrapes do not spend the user budget
+        limiter.request_filter(is_priority_request)
 
         return limiter
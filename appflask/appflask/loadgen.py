@@ -0,0 +1,487 @@
+"""Load generator for the Flask application.
+
+This module drives the application with many concurrent requests from a
+single asyncio event loop, either over keep-alive loopback connections or
+in-process through the ASGI adapter, and reports latency histograms split by
+response status as JSON.
+
+Two modes are supported:
+
+- ``open``: requests start at a constant rate whether or not earlier ones have
+  completed, like independent clients. Latency is measured from the time each
+  request was scheduled to start, so a server stall is charged to every
+  request it delayed (coordinated-omission correction).
+- ``closed``: a fixed number of clients each send their next request as soon
+  as the previous one completes. With ``--expected-interval-ms``, responses
+  slower than the interval also record the requests the client would have
+  sent meanwhile, as HdrHistogram's ``recordValueWithExpectedInterval`` does.
+
+Usage:
+    python -m appflask.loadgen --url http://127.0.0.1:5000/health --rate 200 --duration 10
+    python -m appflask.loadgen --in-process --path / --mode closed --concurrency 16
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+# Percentiles reported for every histogram
+REPORTED_PERCENTILES = (50.0, 90.0, 99.0, 99.9, 99.99)
+
+# Status key of requests that failed without an HTTP response
+ERROR_STATUS = "error"
+
+
+class LatencyHistogram:
+    """Latency histogram with the log-linear bucketing of HdrHistogram.
+
+    Values are recorded in microseconds. Every power-of-two range is split
+    into linear sub-buckets, so any recorded value is reported within a
+    relative error of ``10 ** -significant_figures``, from microseconds to
+    minutes, with a bounded number of buckets.
+
+    Attributes:
+        count: Number of recorded values
+        total: Sum of the recorded values
+        min: Smallest recorded value
+        max: Largest recorded value
+
+    """
+
+    def __init__(self, significant_figures: int = 3) -> None:
+        """Create an empty histogram with the given precision."""
+        largest_single_unit = 2 * 10 ** significant_figures
+        self._sub_bucket_bits = math.ceil(math.log2(largest_single_unit))
+        self._sub_bucket_half = 1 << (self._sub_bucket_bits - 1)
+        self._counts: dict[int, int] = defaultdict(int)
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        bucket = max(0, value.bit_length() - self._sub_bucket_bits)
+        return (bucket + 1) * self._sub_bucket_half + (value >> bucket) - self._sub_bucket_half
+
+    def _highest_equivalent(self, index: int) -> int:
+        bucket = index // self._sub_bucket_half - 1
+        sub_bucket = index % self._sub_bucket_half + self._sub_bucket_half
+        if bucket < 0:
+            bucket, sub_bucket = 0, sub_bucket - self._sub_bucket_half
+        return ((sub_bucket + 1) << bucket) - 1
+
+    def record(self, value: int, count: int = 1) -> None:
+        """Record a value, in microseconds, ``count`` times."""
+        value = max(0, int(value))
+        self._counts[self._index(value)] += count
+        self.min = value if not self.count else min(self.min, value)
+        self.max = max(self.max, value)
+        self.count += count
+        self.total += value * count
+
+    def record_corrected(self, value: int, expected_interval: int) -> None:
+        """Record a value and the values of the requests it held back.
+
+        Args:
+            value: Measured latency in microseconds
+            expected_interval: Interval between two requests of one client
+
+        """
+        self.record(value)
+        if expected_interval <= 0:
+            return
+        missing = value - expected_interval
+        while missing >= expected_interval:
+            self.record(missing)
+            missing -= expected_interval
+
+    def value_at_percentile(self, percentile: float) -> int:
+        """Return the value below which ``percentile`` percent of values fall."""
+        if not self.count:
+            return 0
+        target = max(1, math.ceil(self.count * percentile / 100))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def buckets(self) -> list[list[int]]:
+        """Return ``[highest equivalent value, count]`` pairs of the used buckets."""
+        return [[self._highest_equivalent(index), self._counts[index]]
+                for index in sorted(self._counts)]
+
+    def summary(self, *, buckets: bool = False) -> dict[str, Any]:
+        """Summarize the histogram in milliseconds.
+
+        Args:
+            buckets: Also include the raw buckets, in microseconds
+
+        Returns:
+            dict: Count, extremes, mean and percentiles
+
+        """
+        summary: dict[str, Any] = {
+            "count": self.count,
+            "min_ms": self.min / 1000,
+            "mean_ms": round(self.total / self.count / 1000, 3) if self.count else 0.0,
+            "max_ms": self.max / 1000,
+            "percentiles_ms": {
+                f"p{percentile:g}": self.value_at_percentile(percentile) / 1000
+                for percentile in REPORTED_PERCENTILES
+            },
+        }
+        if buckets:
+            summary["buckets_us"] = self.buckets()
+        return summary
+
+
+class StatusStats:
+    """Latency histograms of the responses with one status.
+
+    Attributes:
+        latency: Latency from the intended start, corrected for coordinated omission
+        service_time: Latency from the moment the request was actually sent
+        first_seconds: Time from the start of the run to the first such response
+
+    """
+
+    def __init__(self) -> None:
+        """Create empty histograms."""
+        self.latency = LatencyHistogram()
+        self.service_time = LatencyHistogram()
+        self.first_seconds: float | None = None
+
+
+class HttpTarget:
+    """Keep-alive HTTP/1.1 client sending requests over a pool of connections.
+
+    Attributes:
+        host: Server host
+        port: Server port
+        connections: Maximum number of open connections
+
+    """
+
+    def __init__(self, url: str, connections: int, timeout: float) -> None:
+        """Target the server of ``url`` with up to ``connections`` connections."""
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.connections = connections
+        self.timeout = timeout
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(connections)
+
+    async def request(self, method: str, path: str, body: bytes) -> int:
+        """Send one request and return its status code."""
+        async with self._slots:
+            try:
+                reader, writer = self._idle.get_nowait()
+            except asyncio.QueueEmpty:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                status, keep_alive = await asyncio.wait_for(
+                    self._exchange(reader, writer, method, path, body), self.timeout,
+                )
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                self._idle.put_nowait((reader, writer))
+            else:
+                writer.close()
+            return status
+
+    async def _exchange(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        method: str,
+        path: str,
+        body: bytes,
+    ) -> tuple[int, bool]:
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+        if body:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        writer.write(head.encode("latin1") + b"\r\n" + body)
+        await writer.drain()
+
+        lines = (await reader.readuntil(b"\r\n\r\n")).decode("latin1").split("\r\n")
+        version, status = lines[0].split(" ", 2)[:2]
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip().lower()
+
+        if headers.get("transfer-encoding") == "chunked":
+            while size := int((await reader.readuntil(b"\r\n")).split(b";")[0], 16):
+                await reader.readexactly(size + 2)
+            await reader.readuntil(b"\r\n")
+        else:
+            await reader.readexactly(int(headers.get("content-length", 0)))
+
+        keep_alive = version == "HTTP/1.1" and headers.get("connection") != "close"
+        return int(status), keep_alive
+
+    async def close(self) -> None:
+        """Close the idle connections."""
+        while not self._idle.empty():
+            _, writer = self._idle.get_nowait()
+            writer.close()
+
+
+class InProcessTarget:
+    """Target calling the application in-process through its ASGI adapter."""
+
+    def __init__(self, app: Flask | None, timeout: float) -> None:
+        """Target ``app``, or the shared application when it is None."""
+        from appflask.asgi import create_asgi_app
+
+        self.asgi_app = create_asgi_app(app)
+        self.timeout = timeout
+
+    async def request(self, method: str, path: str, body: bytes) -> int:
+        """Send one request and return its status code."""
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "http_version": "1.1",
+            "method": method,
+            "path": path,
+            "query_string": query.encode("ascii"),
+            "headers": [(b"host", b"loadgen"), (b"content-type", b"application/json")],
+            "client": ("127.0.0.1", 0),
+            "server": ("loadgen", 80),
+        }
+        status = 0
+
+        async def receive() -> dict[str, Any]:
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message: dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        await asyncio.wait_for(self.asgi_app(scope, receive, send), self.timeout)
+        return status
+
+    async def close(self) -> None:
+        """Nothing to close; the adapter's threads are shared."""
+
+
+class LoadGenerator:
+    """Send requests to a target and collect their latencies by status.
+
+    Attributes:
+        target: Target receiving the requests
+        method: HTTP method of every request
+        path: Path, with query string, of every request
+        body: Request body
+
+    """
+
+    def __init__(self, target: HttpTarget | InProcessTarget, method: str,
+                 path: str, body: bytes = b"") -> None:
+        """Prepare a run against ``target``."""
+        self.target = target
+        self.method = method
+        self.path = path
+        self.body = body
+        self.stats: dict[int | str, StatusStats] = defaultdict(StatusStats)
+        self.overall = LatencyHistogram()
+        self.sent = 0
+        self._start = 0.0
+
+    async def _send(self, intended: float, expected_interval: int = 0) -> None:
+        """Send one request scheduled at ``intended`` and record its latencies."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            status: int | str = await self.target.request(self.method, self.path, self.body)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            status = ERROR_STATUS
+        finished = loop.time()
+
+        latency = int((finished - intended) * 1_000_000)
+        stats = self.stats[status]
+        stats.latency.record_corrected(latency, expected_interval)
+        stats.service_time.record(int((finished - started) * 1_000_000))
+        self.overall.record_corrected(latency, expected_interval)
+        if stats.first_seconds is None:
+            stats.first_seconds = round(finished - self._start, 6)
+
+    async def run_open(self, rate: float, duration: float | None,
+                       requests: int | None) -> float:
+        """Start requests at a constant rate until the duration or count is reached.
+
+        Returns:
+            float: Elapsed time in seconds
+
+        """
+        loop = asyncio.get_running_loop()
+        self._start = loop.time()
+        total = requests if requests is not None else math.ceil(rate * duration)
+        tasks = set()
+        for index in range(total):
+            intended = self._start + index / rate
+            delay = intended - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(self._send(intended))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            self.sent += 1
+        if tasks:
+            await asyncio.gather(*tasks)
+        return loop.time() - self._start
+
+    async def run_closed(self, concurrency: int, duration: float | None,
+                         requests: int | None, expected_interval: float) -> float:
+        """Run clients that send back-to-back requests until the duration or count.
+
+        Returns:
+            float: Elapsed time in seconds
+
+        """
+        loop = asyncio.get_running_loop()
+        self._start = loop.time()
+        deadline = self._start + duration if duration is not None else math.inf
+        interval = int(expected_interval * 1_000_000)
+
+        async def client() -> None:
+            while loop.time() < deadline and (requests is None or self.sent < requests):
+                self.sent += 1
+                await self._send(loop.time(), interval)
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return loop.time() - self._start
+
+    def report(self, elapsed: float, *, buckets: bool = False) -> dict[str, Any]:
+        """Build the JSON report of the run."""
+        completed = sum(stats.service_time.count for status, stats in self.stats.items()
+                        if status != ERROR_STATUS)
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "requests_sent": self.sent,
+            "requests_completed": completed,
+            "errors": self.stats[ERROR_STATUS].service_time.count
+            if ERROR_STATUS in self.stats else 0,
+            "throughput_rps": round(completed / elapsed, 1) if elapsed else 0.0,
+            "latency": self.overall.summary(buckets=buckets),
+            "statuses": {
+                str(status): {
+                    "count": stats.service_time.count,
+                    "first_seconds": stats.first_seconds,
+                    "latency": stats.latency.summary(buckets=buckets),
+                    "service_time": stats.service_time.summary(buckets=buckets),
+                }
+                for status, stats in sorted(self.stats.items(), key=lambda item: str(item[0]))
+            },
+        }
+
+
+async def run(args: argparse.Namespace, app: Flask | None = None) -> dict[str, Any]:
+    """Run the load described by parsed command line arguments.
+
+    Args:
+        args: Parsed arguments of ``parse_args``
+        app: Application used by the in-process target instead of the shared one
+
+    Returns:
+        dict: JSON report of the run
+
+    """
+    if args.in_process:
+        target: HttpTarget | InProcessTarget = InProcessTarget(app, args.timeout)
+        path = args.path
+    else:
+        target = HttpTarget(args.url, args.concurrency, args.timeout)
+        parts = urlsplit(args.url)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+    generator = LoadGenerator(target, args.method, path, (args.body or "").encode())
+    try:
+        if args.mode == "open":
+            elapsed = await generator.run_open(args.rate, args.duration, args.requests)
+        else:
+            elapsed = await generator.run_closed(
+                args.concurrency, args.duration, args.requests,
+                args.expected_interval_ms / 1000,
+            )
+    finally:
+        await target.close()
+
+    return {
+        "config": {
+            "target": "in-process" if args.in_process else args.url,
+            "method": args.method,
+            "path": path,
+            "mode": args.mode,
+            "rate": args.rate if args.mode == "open" else None,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "requests": args.requests,
+        },
+        **generator.report(elapsed, buckets=args.histogram),
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line of the load generator."""
+    parser = argparse.ArgumentParser(
+        prog="python -m appflask.loadgen", description=__doc__.splitlines()[0],
+    )
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Target URL, e.g. http://127.0.0.1:5000/health")
+    target.add_argument("--in-process", action="store_true",
+                        help="Call a freshly created application without a server")
+    parser.add_argument("--path", default="/health", help="Path used with --in-process")
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--body", help="Request body, e.g. a JSON document")
+    parser.add_argument("--mode", choices=["open", "closed"], default="open")
+    parser.add_argument("--rate", type=float, default=100.0,
+                        help="Requests started per second in open mode")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="Clients in closed mode, connections in open mode")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--requests", type=int,
+                        help="Stop after this many requests instead of --duration")
+    parser.add_argument("--expected-interval-ms", type=float, default=0.0,
+                        help="Closed mode: interval used to correct coordinated omission")
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="Seconds before a request counts as an error")
+    parser.add_argument("--histogram", action="store_true",
+                        help="Include the raw histogram buckets in the report")
+    parser.add_argument("--output", help="Write the report to this file instead of stdout")
+    args = parser.parse_args(argv)
+    if args.requests is not None:
+        args.duration = None
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the load generator from the command line and print its JSON report."""
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:  # noqa: PTH123
+            file.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Logging module for the Flask application.
+
+This module routes log records through a queue: the threads handling
+requests only put records on a bounded queue, and a background listener
+thread formats and writes them, as text or as JSON lines. Records from noisy
+loggers, such as the rate limit rejections during a 429 storm, are sampled:
+the first record of each message is written and the repeats within the
+sampling interval are replaced by a single summary line.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import TYPE_CHECKING, Any
+
+from appflask.metrics import LOG_RECORDS_DROPPED
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+# Format of the text output, the same as the one of the entry point
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every log record has, left out of the JSON extra fields
+RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Serialize a record and its extra attributes to JSON."""
+        entry: dict[str, Any] = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value) for key, value in vars(record).items()
+            if key not in RECORD_ATTRIBUTES and not key.startswith("_")
+        )
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Let the first record of each message through per interval and count the rest.
+
+    Attributes:
+        interval: Sampling interval in seconds, 0 disables sampling
+        loggers: Names of the loggers whose records are sampled
+
+    """
+
+    def __init__(self, interval: float, loggers: tuple[str, ...]) -> None:
+        """Sample the records of ``loggers`` over ``interval`` seconds."""
+        super().__init__()
+        self.interval = interval
+        self.loggers = frozenset(loggers)
+        self._lock = threading.Lock()
+        # (logger, message template, level) -> [window start, suppressed count]
+        self._windows: dict[tuple[str, Any, int], list[float]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Return whether the record opens a new sampling window."""
+        if not self.interval or record.name not in self.loggers:
+            return True
+        key = (record.name, record.msg, record.levelno)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                self._windows[key] = [time.monotonic(), 0]
+                return True
+            window[1] += 1
+        return False
+
+    def summaries(self, *, force: bool = False) -> list[logging.LogRecord]:
+        """Close the elapsed windows and summarize the records they suppressed.
+
+        Args:
+            force: Close every window, elapsed or not
+
+        Returns:
+            list: One summary record per window that suppressed records
+
+        """
+        now = time.monotonic()
+        records = []
+        with self._lock:
+            for key, (start, suppressed) in list(self._windows.items()):
+                if not force and now - start < self.interval:
+                    continue
+                del self._windows[key]
+                if suppressed:
+                    name, msg, level = key
+                    records.append(logging.makeLogRecord({
+                        "name": name,
+                        "levelno": level,
+                        "levelname": logging.getLevelName(level),
+                        "msg": "%d more records like %r in the last %.1fs",
+                        "args": (suppressed, str(msg), now - start),
+                        "suppressed": suppressed,
+                    }))
+        return records
+
+    def open_windows(self) -> int:
+        """Return the number of sampling windows currently open."""
+        with self._lock:
+            return len(self._windows)
+
+    def reset_lock(self) -> None:
+        """Replace the lock, which a thread may have held when the process forked."""
+        self._lock = threading.Lock()
+
+
+class StderrHandler(logging.StreamHandler):
+    """Stream handler writing to whatever ``sys.stderr`` is when a record is written."""
+
+    def __init__(self) -> None:
+        """Create the handler without binding it to the current stream."""
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self) -> Any:  # noqa: ANN401
+        """Return the current standard error stream."""
+        return sys.stderr
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that never blocks nor formats in the calling thread.
+
+    Records are put on the queue as they are, so the message is only
+    formatted by the listener, and records arriving while the queue is full
+    are dropped and counted.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Return the record unchanged; the queue never leaves the process."""
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Put a record on the queue, or drop it if the queue is full."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class SamplingQueueListener(QueueListener):
+    """Queue listener that also writes the summaries of the sampled records."""
+
+    def __init__(self, log_queue: queue.Queue, handler: logging.Handler,
+                 sampler: SamplingFilter) -> None:
+        """Write the records of ``log_queue`` and of ``sampler`` to ``handler``."""
+        super().__init__(log_queue, handler, respect_handler_level=True)
+        self.sampler = sampler
+        self._next_summaries = 0.0
+
+    def dequeue(self, block: bool) -> logging.LogRecord | None:  # noqa: FBT001
+        """Wait for the next record, writing due summaries in the meantime."""
+        while True:
+            try:
+                record = self.queue.get(block, timeout=self.sampler.interval or None)
+            except queue.Empty:
+                self._write_summaries(force=False)
+                continue
+            if record is self._sentinel:
+                self._write_summaries(force=True)
+            elif time.monotonic() >= self._next_summaries:
+                # A steady flow of records must not postpone the summaries
+                self._write_summaries(force=False)
+            return record
+
+    def enqueue_sentinel(self) -> None:
+        """Queue the stop marker, waiting for room if the queue is full."""
+        self.queue.put(self._sentinel)
+
+    def _write_summaries(self, *, force: bool) -> None:
+        self._next_summaries = time.monotonic() + self.sampler.interval
+        for summary in self.sampler.summaries(force=force):
+            self.handle(summary)
+
+
+class LogPipeline:
+    """Queue, handlers and listener thread moving log records off the request path.
+
+    Attributes:
+        queue: Bounded queue between the logging threads and the listener
+        sampler: Filter sampling the records of the noisy loggers
+        handler: Queue handler installed on the root logger
+        output: Handler writing the records, run by the listener
+        listener: Background listener thread
+
+    """
+
+    def __init__(self, queue_size: int) -> None:
+        """Create the pipeline; nothing is written until ``start``."""
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.sampler = SamplingFilter(0, ())
+        self.handler = DroppingQueueHandler(self.queue)
+        self.handler.addFilter(self.sampler)
+        self.output = StderrHandler()
+        self.listener = SamplingQueueListener(self.queue, self.output, self.sampler)
+
+    def start(self) -> None:
+        """Start the listener thread."""
+        self.listener.start()
+
+    def stop(self) -> None:
+        """Write the queued records and summaries, then stop the listener."""
+        if self.listener._thread is not None:  # noqa: SLF001
+            self.listener.stop()
+        self.output.flush()
+
+    def restart_after_fork(self) -> None:
+        """Give a forked child its own queue and listener thread.
+
+        The parent's listener thread does not exist in the child, and the
+        parent's queue may have been locked by another thread during the fork.
+        """
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self.handler.queue = self.queue
+        self.sampler.reset_lock()
+        self.listener = SamplingQueueListener(self.queue, self.output, self.sampler)
+        self.start()
+
+
+# Pipeline of this process, created by the first ``configure_logging`` call
+_pipeline: LogPipeline | None = None
+
+
+def configure_logging(config: Mapping[str, Any]) -> None:
+    """Route the root logger through the logging queue and apply the settings.
+
+    The first call replaces the synchronous stream handlers installed by
+    ``logging.basicConfig``; later calls, such as a configuration reload, only
+    update the level, the output format and the sampling settings.
+
+    Args:
+        config: Application configuration
+
+    """
+    # ruff: noqa: PLW0603
+    global _pipeline
+    root = logging.getLogger()
+    if _pipeline is None:
+        _pipeline = LogPipeline(config["LOG_QUEUE_SIZE"])
+        for handler in list(root.handlers):
+            if type(handler) is logging.StreamHandler:
+                root.removeHandler(handler)
+        root.addHandler(_pipeline.handler)
+        _pipeline.start()
+        os.register_at_fork(after_in_child=_pipeline.restart_after_fork)
+        atexit.register(stop_logging)
+
+    root.setLevel(config["LOG_LEVEL"])
+    _pipeline.output.setFormatter(
+        JsonFormatter() if config["LOG_FORMAT"] == "json"
+        else logging.Formatter(TEXT_FORMAT),
+    )
+    _pipeline.sampler.interval = config["LOG_SAMPLE_INTERVAL_SECONDS"]
+    _pipeline.sampler.loggers = frozenset(config["LOG_SAMPLED_LOGGERS"])
+
+
+def stop_logging() -> None:
+    """Write every queued log record before the process exits."""
+    if _pipeline is not None:
+        _pipeline.stop()
+
+def buffered_records() -> int:
+    """Return the records waiting in the queue plus the open sampling windows."""
+    if _pipeline is None:
+        return 0
+    return _pipeline.queue.qsize() + _pipeline.sampler.open_windows()
@@ -2,10 +2,10 @@
 from __future__ import annotations
 
 import logging
-import time
+import threading
 from http import HTTPStatus
 
-from flask import Flask, Response, request
+from flask import Flask, Response, current_app, request
 from prometheus_client import (
     CONTENT_TYPE_LATEST,
     CollectorRegistry,
@@ -15,12 +15,18 @@ from prometheus_client import (
     generate_latest,
 )
 
+from appflask.compression import mark_stable
+from appflask.warmup import WARMUP_ENVIRON_KEY
+
 # Initialize logger
 logger = logging.getLogger(__name__)
 
 # Define a consistent prefix for all metrics
 METRIC_PREFIX = "appflask_"
 
+# Response statuses whose request counters exist before the first request
+PRECREATED_STATUSES = (HTTPStatus.OK.value, HTTPStatus.TOO_MANY_REQUESTS.value)
+
 # Create a custom registry for our metrics
 CUSTOM_REGISTRY = CollectorRegistry(auto_describe=True)
 
@@ -64,6 +70,83 @@ APP_INFO = Gauge(
     registry=CUSTOM_REGISTRY,
 )
 
+CONCURRENCY_LIMIT = Gauge(
+    f"{METRIC_PREFIX}concurrency_limit",
+    "Current adaptive limit on the number of requests in flight",
+    registry=CUSTOM_REGISTRY,
+)
+
+REQUESTS_SHED = Counter(
+    f"{METRIC_PREFIX}requests_shed_total",
+    "Total number of requests shed because the concurrency limit was reached",
+    registry=CUSTOM_REGISTRY,
+)
+
+LANE_REQUESTS = Counter(
+    f"{METRIC_PREFIX}lane_requests_total",
+    "Total number of requests per priority lane and admission outcome",
+    ["lane", "outcome"],
+    registry=CUSTOM_REGISTRY,
+)
+
+LANE_LATENCY = Histogram(
+    f"{METRIC_PREFIX}lane_request_duration_seconds",
+    "Request latency in seconds per priority lane, rejections included",
+    ["lane"],
+    registry=CUSTOM_REGISTRY,
+)
+
+CONFIG_RELOADS = Counter(
+    f"{METRIC_PREFIX}config_reloads_total",
+    "Total number of configuration reloads",
+    ["result"],
+    registry=CUSTOM_REGISTRY,
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    f"{METRIC_PREFIX}log_records_dropped_total",
+    "Total number of log records dropped because the logging queue was full",
+    registry=CUSTOM_REGISTRY,
+)
+
+DRAIN_DURATION = Gauge(
+    f"{METRIC_PREFIX}drain_duration_seconds",
+    "Time the last drain took, from the stop signal to the last request",
+    registry=CUSTOM_REGISTRY,
+)
+
+REQUESTS_DROPPED = Counter(
+    f"{METRIC_PREFIX}drain_requests_dropped_total",
+    "Total number of requests still running when a drain reached its deadline",
+    registry=CUSTOM_REGISTRY,
+)
+
+LIMITER_SNAPSHOTS = Counter(
+    f"{METRIC_PREFIX}limiter_snapshots_total",
+    "Total number of limiter state snapshots by result",
+    ["result"],
+    registry=CUSTOM_REGISTRY,
+)
+
+LIMITER_SNAPSHOT_BYTES = Gauge(
+    f"{METRIC_PREFIX}limiter_snapshot_bytes",
+    "Size of the last limiter state snapshot written",
+    registry=CUSTOM_REGISTRY,
+)
+
+LIMITER_SNAPSHOT_WRITE_SECONDS = Histogram(
+    f"{METRIC_PREFIX}limiter_snapshot_write_seconds",
+    "Time taken to serialize and write a limiter state snapshot",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05),
+    registry=CUSTOM_REGISTRY,
+)
+
+LIMITER_SNAPSHOT_LOAD_SECONDS = Gauge(
+    f"{METRIC_PREFIX}limiter_snapshot_load_seconds",
+    "Time taken to restore the limiter state snapshot on startup",
+    registry=CUSTOM_REGISTRY,
+)
+
 APP_START_TIME = Gauge(
     f"{METRIC_PREFIX}start_time_seconds",
     "Unix timestamp of application start time",
@@ -77,17 +160,62 @@ APP_UPTIME = Gauge(
 )
 
 
+class InFlightRequests:
+    """Requests an application is handling, mirrored in the in-flight gauge.
+
+    A streamed response stays in flight until its body has been sent.
+
+    Attributes:
+        count: Number of requests in flight
+
+    """
+
+    def __init__(self) -> None:
+        """Start with no request in flight."""
+        self.count = 0
+        self._idle = threading.Condition()
+
+    def start(self) -> None:
+        """Count a request starting."""
+        with self._idle:
+            self.count += 1
+        IN_FLIGHT.inc()
+
+    def finish(self) -> None:
+        """Count a request finishing."""
+        with self._idle:
+            self.count -= 1
+            if not self.count:
+                self._idle.notify_all()
+        IN_FLIGHT.dec()
+
+    def wait_idle(self, timeout: float) -> int:
+        """Wait until no request is in flight, for at most ``timeout`` seconds.
+
+        Args:
+            timeout: Longest time to wait in seconds
+
+        Returns:
+            int: Number of requests still in flight
+
+        """
+        with self._idle:
+            self._idle.wait_for(lambda: not self.count, timeout)
+            return self.count
+
+
 class MetricsCollector:
     """Collector for application metrics using Prometheus client."""
 
     def __init__(self, app: Flask | None = None) -> None:
-        """Initialize metrics collector with optional Flask app."""
-        self.app = app
-        self.start_time = time.time()
-        APP_START_TIME.set(self.start_time)
+        """Initialize metrics collector with optional Flask app.
 
-        # Initialize with some default values to ensure metrics appear
-        self._initialize_default_metrics()
+        Nothing is recorded until an application is attached with ``init_app``,
+        so creating the collector at import time has no side effects.
+        """
+        self.app = app
+        self.start_time = None
+        self._defaults_initialized = False
 
         if app is not None:
             self.init_app(app)
@@ -112,6 +240,16 @@ class MetricsCollector:
     def init_app(self, app: Flask) -> None:
         """Initialize metrics collection for a Flask application."""
         self.app = app
+        self.start_time = app.start_time = app.clock.time()
+        APP_START_TIME.set(self.start_time)
+        app.in_flight = InFlightRequests()
+        # Last metrics page and the time it was generated
+        app.metrics_snapshot = None
+
+        # Initialize with some default values to ensure metrics appear
+        if not self._defaults_initialized:
+            self._initialize_default_metrics()
+            self._defaults_initialized = True
 
         # Register metrics endpoint
         app.add_url_rule("/metrics", "metrics", self.metrics)
@@ -122,20 +260,46 @@ class MetricsCollector:
 
         logger.debug("Metrics collection initialized with prefix: %s", METRIC_PREFIX)
 
+    def precreate_labels(self, app: Flask) -> None:
+        """Create the label children of every route before the first request.
+
+        Args:
+            app: Flask application whose routes are labelled
+
+        """
+        excluded = app.settings["METRICS_EXCLUDED_ENDPOINTS"]
+        for rule in app.url_map.iter_rules():
+            if rule.endpoint == "static" or rule.endpoint in excluded:
+                continue
+            for method in rule.methods - {"HEAD", "OPTIONS"}:
+                REQUEST_LATENCY.labels(method=method, endpoint=rule.endpoint)
+                for status in PRECREATED_STATUSES:
+                    REQUEST_COUNT.labels(
+                        method=method, endpoint=rule.endpoint, status=status,
+                    )
+
+        logger.debug("Metric label children created")
+
     def before_request(self) -> None:
         """Handle tasks before each request, like tracking in-flight requests."""
         # Store start time for calculating request duration
-        request.start_time = time.time()
+        request.start_time = current_app.clock.monotonic()
 
         # Increment in-flight requests counter
-        IN_FLIGHT.inc()
+        current_app.in_flight.start()
 
     def after_request(self, response: Response) -> Response:
         """Handle tasks after each request, like recording metrics."""
-        # Skip metrics endpoint to avoid circular measurements
-        if request.endpoint != "metrics":
+        # Skip excluded endpoints, such as the metrics endpoint to avoid
+        # circular measurements, and warmup requests so they do not show up
+        # as traffic
+        config = current_app.settings
+        if (config["METRICS_ENABLED"]
+                and request.endpoint not in config["METRICS_EXCLUDED_ENDPOINTS"]
+                and WARMUP_ENVIRON_KEY not in request.environ):
             # Record request latency
-            latency = time.time() - getattr(request, "start_time", time.time())
+            now = current_app.clock.monotonic()
+            latency = now - getattr(request, "start_time", now)
             REQUEST_LATENCY.labels(
                 method=request.method,
                 endpoint=request.endpoint or "unknown",
@@ -157,28 +321,42 @@ class MetricsCollector:
             if remaining and remaining.isdigit():
                 RATE_LIMIT_REMAINING.set(int(remaining))
 
-        # Decrement in-flight requests
-        IN_FLIGHT.dec()
+        # Decrement in-flight requests, unless the request was rejected before
+        # it was counted; a stream is in flight until its body is sent
+        if hasattr(request, "start_time"):
+            if response.is_streamed:
+                response.call_on_close(current_app.in_flight.finish)
+            else:
+                current_app.in_flight.finish()
 
         return response
 
     def metrics(self) -> Response:
-        """Generate Prometheus metrics page."""
-        # Update uptime metric
-        APP_UPTIME.set(time.time() - self.start_time)
-
-        # Debug logging
-        metric_names = [metric.name for metric in CUSTOM_REGISTRY.collect()]
-        logger.debug("Available metrics: %s", metric_names)
-
-        # Generate metrics from our custom registry
-        metrics_data = generate_latest(CUSTOM_REGISTRY)
+        """Generate Prometheus metrics page.
+
+        Scrapes within ``METRICS_SNAPSHOT_SECONDS`` of the last generated page
+        get that page again, so their compressed form is shared too.
+        """
+        now = current_app.clock.monotonic()
+        snapshot = current_app.metrics_snapshot
+        if (snapshot is None
+                or now - snapshot[0] >= current_app.settings["METRICS_SNAPSHOT_SECONDS"]):
+            # Update uptime metric
+            APP_UPTIME.set(current_app.clock.time() - current_app.start_time)
+
+            # Debug logging
+            metric_names = [metric.name for metric in CUSTOM_REGISTRY.collect()]
+            logger.debug("Available metrics: %s", metric_names)
+
+            # Generate metrics from our custom registry
+            snapshot = (now, generate_latest(CUSTOM_REGISTRY))
+            current_app.metrics_snapshot = snapshot
 
         # Create response with correct content type
-        response = Response(metrics_data)
+        response = Response(snapshot[1])
         response.headers["Content-Type"] = CONTENT_TYPE_LATEST
 
-        return response
+        return mark_stable(response)
 
 
 # Create a global metrics collector instance
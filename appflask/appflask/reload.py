@@ -0,0 +1,146 @@
+"""Configuration reload module for the Flask application.
+
+This module applies a resolved configuration snapshot to an application and
+swaps it for a fresh one on ``SIGHUP``, without a restart: the limiter limits,
+the precomputed rate limit messages, the concurrency limit bounds, the
+compression settings and cache, the metrics settings and the logging level, format and sampling of the next request follow
+the new snapshot, and the requests already counted in the current window are
+kept.
+
+Settings that shape the server, the limiter storage or the error handler
+registration only take effect on restart; a reload keeps their current values
+and logs a warning when they change.
+"""
+from __future__ import annotations
+
+import logging
+import signal
+import threading
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any
+
+from appflask.compression import CompressionCache
+from appflask.concurrency import build_overload_response
+from appflask.config import resolve_config
+from appflask.errors import build_rate_limit_messages
+from appflask.limiter import carry_over_counters, limit_string
+from appflask.logs import configure_logging
+from appflask.metrics import CONFIG_RELOADS
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+    from types import FrameType
+
+    from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+# Configuration keys that cannot change while the application is serving
+RESTART_ONLY_PREFIXES = ("SERVER_", "ASGI_")
+RESTART_ONLY_KEYS = frozenset({
+    "DEBUG",
+    "TESTING",
+    "RATE_LIMIT_CODE",
+    "CONCURRENCY_INITIAL_LIMIT",
+    "RATELIMIT_ENABLED",
+    "RATELIMIT_STORAGE_URI",
+    "RATELIMIT_STRATEGY",
+    "RATELIMIT_HEADERS_ENABLED",
+    "WARMUP_ENABLED",
+    "LOG_QUEUE_SIZE",
+    "LIMITER_SNAPSHOT_PATH",
+})
+
+# Serializes reloads triggered by signals arriving close together
+_reload_lock = threading.Lock()
+
+
+def restart_only(key: str) -> bool:
+    """Return whether a configuration key only takes effect on restart."""
+    return key in RESTART_ONLY_KEYS or key.startswith(RESTART_ONLY_PREFIXES)
+
+
+def apply_config(app: Flask, config: Mapping[str, Any]) -> None:
+    """Make a configuration snapshot the one read by the request path.
+
+    The snapshot and the values derived from it are each swapped with a
+    single assignment, so a request sees either the old or the new value of
+    each of them, never a partially updated one.
+
+    Args:
+        app: Flask application to configure
+        config: Resolved configuration
+
+    """
+    config = MappingProxyType(dict(config))
+    previous = getattr(app, "settings", None)
+
+    app.config.update(config)
+    configure_logging(config)
+    app.rate_limit_messages = build_rate_limit_messages(config)
+    app.overload_response = build_overload_response(config)
+    app.compression_cache = CompressionCache(config["COMPRESSION_CACHE_SIZE"])
+    app.settings = config
+
+    concurrency_limiter = getattr(app, "concurrency_limiter", None)
+    if concurrency_limiter is not None:
+        concurrency_limiter.configure(config)
+
+    limiter = getattr(app, "limiter", None)
+    if limiter is not None and previous is not None:
+        old, new = limiter.dynamic_limit.value, limit_string(config)
+        if old != new:
+            limiter.dynamic_limit.value = new
+            moved = carry_over_counters(limiter, old, new)
+            logger.info("Rate limit changed from %s to %s (%d counters kept)",
+                        old, new, moved)
+
+
+def reload_config(app: Flask) -> bool:
+    """Resolve the configuration again and apply it to a running application.
+
+    Args:
+        app: Flask application to reconfigure
+
+    Returns:
+        bool: True if the new configuration was applied, False if it was invalid
+
+    """
+    with _reload_lock:
+        try:
+            config = dict(resolve_config())
+        except (OSError, ValueError, TypeError) as e:
+            logger.error("Configuration reload failed, keeping the current one: %s", e)  # noqa: TRY400
+            CONFIG_RELOADS.labels(result="failed").inc()
+            return False
+
+        current = app.settings
+        for key in [key for key in config if restart_only(key)]:
+            if config[key] != current.get(key):
+                logger.warning("Configuration key %s only changes on restart", key)
+            config[key] = current.get(key)
+
+        changed = sorted(key for key, value in config.items()
+                         if current.get(key) != value)
+        apply_config(app, config)
+        logger.info("Configuration reloaded, changed keys: %s", changed or "none")
+        CONFIG_RELOADS.labels(result="applied").inc()
+        return True
+
+
+def install_reload_handler(app: Flask) -> None:
+    """Reload the configuration of ``app`` whenever the process gets ``SIGHUP``.
+
+    The reload runs in a short-lived thread so the signal handler never blocks
+    the request being handled by the interrupted thread.
+
+    Args:
+        app: Flask application to reconfigure
+
+    """
+    def handle_reload(signum: int, frame: FrameType | None) -> None:  # noqa: ARG001
+        threading.Thread(
+            target=reload_config, args=(app,), name="appflask-reload", daemon=True,
+        ).start()
+
+    signal.signal(signal.SIGHUP, handle_reload)
@@ -2,11 +2,26 @@
 
 This module defines the endpoints available in the application.
 """
+from __future__ import annotations
+
+import json
 import logging
 import os
+import time
+from collections.abc import Callable, Iterator
 from datetime import datetime, timezone
+from typing import Any
+
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    request,
+    stream_with_context,
+)
 
-from flask import Blueprint, Response, jsonify
+from appflask.compression import mark_stable
 
 # Import the global version variable
 from appflask.version import get_version
@@ -15,12 +30,15 @@ from appflask.version import get_version
 main_blueprint = Blueprint("main", __name__)
 logger = logging.getLogger(__name__)
 
-@main_blueprint.route("/")
-def hello_world() -> Response:
-    """Return a greeting with agent name, version and time.
+# Content type used by the streaming endpoint
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def greeting_payload() -> dict[str, Any]:
+    """Build the greeting returned by the main endpoint.
 
     Returns:
-        Response: JSON response with greeting message
+        dict: Payload with the greeting message
 
     """
     agent_name = os.getenv("AGENT_NAME", "Unknown")
@@ -44,7 +62,73 @@ def hello_world() -> Response:
         f"the time is {time_now}"
     )
 
-    return jsonify({"message": message})
+    return {"message": message}
+
+
+def health_payload() -> dict[str, Any]:
+    """Build the payload returned by the health check endpoint.
+
+    Returns:
+        dict: Payload with the health status
+
+    """
+    return {"status": "healthy"}
+
+
+# Queries that can be answered by the batch and streaming endpoints
+QUERY_HANDLERS: dict[str, Callable[[], dict[str, Any]]] = {
+    "greeting": greeting_payload,
+    "health": health_payload,
+}
+
+
+def answer_queries(queries: list[str]) -> list[dict[str, Any]]:
+    """Answer a list of queries in order.
+
+    Args:
+        queries: Names of the queries to answer
+
+    Returns:
+        list: One result per query, tagged with the query name
+
+    """
+    return [{"query": query, **QUERY_HANDLERS[query]()} for query in queries]
+
+
+def validate_queries(queries: Any) -> str | None:  # noqa: ANN401
+    """Check that a list of queries can be answered.
+
+    Args:
+        queries: Value supplied by the client as the list of queries
+
+    Returns:
+        str | None: An error message, or None if the queries are valid
+
+    """
+    if not isinstance(queries, list) or not queries:
+        return "'queries' must be a non-empty list"
+
+    max_queries = current_app.settings["BATCH_MAX_QUERIES"]
+    if len(queries) > max_queries:
+        return f"At most {max_queries} queries are allowed per call"
+
+    unknown = [query for query in queries if query not in QUERY_HANDLERS]
+    if unknown:
+        return f"Unknown queries: {', '.join(map(str, unknown))}"
+
+    return None
+
+
+@main_blueprint.route("/")
+def hello_world() -> Response:
+    """Return a greeting with agent name, version and time.
+
+    Returns:
+        Response: JSON response with greeting message
+
+    """
+    # The greeting only changes once a minute
+    return mark_stable(jsonify(greeting_payload()))
 
 @main_blueprint.route("/health")
 def health_check() -> tuple[Response, int]:
@@ -55,4 +139,72 @@ def health_check() -> tuple[Response, int]:
 
     """
     logger.debug("Health check request received")
-    return jsonify({"status": "healthy"}), 200
+    return jsonify(health_payload()), 200
+
+@main_blueprint.route("/ready")
+def readiness_check() -> tuple[Response, int]:
+    """Readiness check endpoint for the Kubernetes readiness probe.
+
+    Returns:
+        tuple: JSON response and 200 once the app is ready, 503 before and
+        while draining
+
+    """
+    if not current_app.ready.is_set():
+        status = "not ready" if current_app.drain_started is None else "draining"
+        return jsonify({"status": status}), 503
+    return jsonify({"status": "ready"}), 200
+
+@main_blueprint.route("/batch", methods=["POST"])
+def batch() -> tuple[Response, int]:
+    """Answer several greeting or health queries in a single response.
+
+    The request body is a JSON object such as
+    ``{"queries": ["greeting", "health"]}``. The whole call is charged to
+    the rate limiter at the configured batch cost.
+
+    Returns:
+        tuple: JSON response with one result per query and HTTP status code
+
+    """
+    body = request.get_json(silent=True) or {}
+    queries = body.get("queries") if isinstance(body, dict) else None
+
+    error = validate_queries(queries)
+    if error is not None:
+        return jsonify({"error": error}), 400
+
+    logger.debug("Handling batch request with %d queries", len(queries))
+    return jsonify({"results": answer_queries(queries)}), 200
+
+@main_blueprint.route("/stream")
+def stream() -> Response | tuple[Response, int]:
+    """Stream greeting or health updates as NDJSON over one connection.
+
+    Query parameters:
+        queries: Comma-separated query names (defaults to ``health``)
+        count: Number of updates to send, capped by ``STREAM_MAX_UPDATES``
+
+    Returns:
+        Response: Streaming NDJSON response, or a JSON error and status code
+
+    """
+    queries = request.args.get("queries", "health").split(",")
+    error = validate_queries(queries)
+    if error is not None:
+        return jsonify({"error": error}), 400
+
+    max_updates = current_app.settings["STREAM_MAX_UPDATES"]
+    count = request.args.get("count", max_updates, type=int)
+    count = max(1, min(count, max_updates))
+    interval = current_app.settings["STREAM_INTERVAL_SECONDS"]
+
+    def generate() -> Iterator[str]:
+        for seq in range(count):
+            if seq:
+                time.sleep(interval)
+            update = {"seq": seq, "results": answer_queries(queries)}
+            yield json.dumps(update) + "\n"
+
+    logger.debug("Streaming %d updates for queries %s", count, queries)
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
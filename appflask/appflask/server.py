@@ -0,0 +1,552 @@
+"""Production pre-fork server for the Flask application.
+
+This module provides a pre-fork HTTP server used instead of the Werkzeug
+development server. A master process opens one ``SO_REUSEPORT`` listener per
+worker slot, so the kernel spreads connections across the slots, and forks a
+worker process per slot that runs requests on a bounded thread pool.
+
+The listeners belong to the master: when a worker is recycled after its
+request budget, or replaced after ``SIGUSR2``, the connections queued on its
+slot simply wait for the next worker of that slot instead of being reset.
+
+Workers are created with ``os.fork`` from the already initialized master, so
+the server also works from the PyInstaller bundle, which cannot re-import the
+application in a fresh interpreter.
+
+``run_wsgi`` serves with the threaded Werkzeug server instead, for the
+``wsgi`` mode. Both servers drain the requests in flight on ``SIGTERM`` (see
+``appflask.drain``).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import random
+import select
+import selectors
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler, make_server
+
+from appflask.drain import finish_drain, install_drain_handler
+from appflask.lanes import PRIORITY_LANE, classify, peek_path
+from appflask.logs import stop_logging
+from appflask.reload import install_reload_handler, reload_config
+
+if TYPE_CHECKING:
+    from types import FrameType
+
+    from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+# Seconds the master waits for a new worker to start accepting
+WORKER_BOOT_TIMEOUT = 10
+# Seconds between two checks of the master loop when no signal arrives
+MASTER_POLL_INTERVAL = 1.0
+# Size of the accept queue of each listener
+LISTEN_BACKLOG = 1024
+# Seconds a new connection may stay silent before it goes to the user lane
+DISPATCH_TIMEOUT = 1.0
+# Seconds between two checks of the dispatcher for silent connections
+DISPATCH_POLL_INTERVAL = 0.05
+
+
+def create_listener(host: str, port: int) -> socket.socket:
+    """Create a listening TCP socket that shares its port with ``SO_REUSEPORT``.
+
+    Args:
+        host: Interface to bind
+        port: Port to listen on
+
+    Returns:
+        socket.socket: Bound and listening socket
+
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    listener = socket.socket(family, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    listener.bind((host, port))
+    listener.listen(LISTEN_BACKLOG)
+    return listener
+
+
+class RequestHandler(WSGIRequestHandler):
+    """Request handler that closes the connection after each response.
+
+    Keep-alive connections would pin a thread of the bounded pool for as long
+    as the client keeps them open.
+    """
+
+    protocol_version = "HTTP/1.0"
+
+
+class LaneDispatcher:
+    """Hand accepted connections to the pool of their lane once they are readable.
+
+    The request line of a connection usually arrives after it is accepted, so
+    the accept loop only registers the connection and a dispatcher thread
+    peeks at its path once it is readable. A client slow to send its request
+    line delays nobody but itself; a connection still silent after
+    ``DISPATCH_TIMEOUT`` goes to the user lane, whose handler waits for it.
+    """
+
+    def __init__(self, server: PooledWSGIServer) -> None:
+        """Start the dispatcher thread of ``server``."""
+        self.server = server
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="appflask-dispatcher", daemon=True,
+        )
+        self._thread.start()
+
+    def add(self, connection: socket.socket, client_address: Any) -> None:  # noqa: ANN401
+        """Wait for the request line of an accepted connection."""
+        deadline = time.monotonic() + DISPATCH_TIMEOUT
+        with self._lock:
+            self._selector.register(
+                connection, selectors.EVENT_READ, (client_address, deadline),
+            )
+
+    def _dispatch(self, key: selectors.SelectorKey, *, readable: bool) -> None:
+        """Submit a registered connection to the pool of its lane."""
+        with self._lock:
+            if key.fileobj not in self._selector.get_map():
+                return
+            self._selector.unregister(key.fileobj)
+        path = peek_path(key.fileobj) if readable else None
+        priority = (path is not None
+                    and classify(path, self.server.app.settings) == PRIORITY_LANE)
+        self.server.submit(key.fileobj, key.data[0], priority=priority)
+
+    def _run(self) -> None:
+        """Dispatch connections as they become readable or time out."""
+        while not self._stopping.is_set():
+            for key, _ in self._selector.select(DISPATCH_POLL_INTERVAL):
+                self._dispatch(key, readable=True)
+            now = time.monotonic()
+            with self._lock:
+                keys = list(self._selector.get_map().values())
+            for key in keys:
+                if key.data[1] <= now:
+                    self._dispatch(key, readable=False)
+
+    def close(self) -> None:
+        """Stop the thread and hand the connections still waiting to the user lane."""
+        self._stopping.set()
+        self._thread.join()
+        with self._lock:
+            keys = list(self._selector.get_map().values())
+        for key in keys:
+            self._dispatch(key, readable=False)
+        self._selector.close()
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """WSGI server running requests on a bounded thread pool.
+
+    With priority threads, connections are classified by path by a
+    ``LaneDispatcher`` and the priority lane runs on a pool of its own, so
+    probes and scrapes are answered even when every user thread is busy.
+
+    Attributes:
+        pool: Thread pool running the requests
+        priority_pool: Thread pool reserved for the priority lane, or None
+        max_requests: Number of requests after which the server stops, or 0
+        handled_requests: Number of requests handled so far
+
+    """
+
+    multithread = True
+
+    def __init__(  # noqa: PLR0913
+        self,
+        host: str,
+        port: int,
+        app: Flask,
+        threads: int,
+        max_requests: int = 0,
+        fd: int | None = None,
+        priority_threads: int = 0,
+    ) -> None:
+        """Serve on the listener ``fd`` with a pool of ``threads`` threads."""
+        self.pool = ThreadPoolExecutor(
+            max_workers=threads,
+            thread_name_prefix="appflask-worker",
+        )
+        self.priority_pool = ThreadPoolExecutor(
+            max_workers=priority_threads,
+            thread_name_prefix="appflask-priority",
+        ) if priority_threads else None
+        self.max_requests = max_requests
+        self.handled_requests = 0
+        self._count_lock = threading.Lock()
+        self._pending: set[Future] = set()  # Connections submitted, not done
+        self._stopping = threading.Event()
+        super().__init__(host, port, app, handler=RequestHandler, fd=fd)
+        self.dispatcher = LaneDispatcher(self) if priority_threads else None
+
+    def process_request(self, request: Any, client_address: Any) -> None:  # noqa: ANN401
+        """Hand an accepted connection to its lane, or to the pool without lanes."""
+        if self.dispatcher is not None:
+            self.dispatcher.add(request, client_address)
+        else:
+            self.submit(request, client_address)
+
+    def submit(self, request: Any, client_address: Any, *, priority: bool = False) -> None:  # noqa: ANN401
+        """Run a connection on the thread pool of its lane."""
+        pool = self.priority_pool if priority else self.pool
+        future = pool.submit(self._process_request_thread, request, client_address)
+        with self._count_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._forget)
+
+    def _forget(self, future: Future) -> None:
+        """Stop tracking a connection that has been handled."""
+        with self._count_lock:
+            self._pending.discard(future)
+
+    def wait_pending(self, timeout: float) -> int:
+        """Wait for the submitted connections, queued or running.
+
+        Args:
+            timeout: Longest time to wait in seconds
+
+        Returns:
+            int: Number of connections not handled yet
+
+        """
+        with self._count_lock:
+            pending = list(self._pending)
+        return len(wait(pending, timeout).not_done)
+
+    def _process_request_thread(self, request: Any, client_address: Any) -> None:  # noqa: ANN401
+        """Handle one connection in a pool thread and count it."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # noqa: BLE001
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+        with self._count_lock:
+            self.handled_requests += 1
+            recycle = 0 < self.max_requests <= self.handled_requests
+        if recycle:
+            self.stop()
+
+    def stop(self) -> None:
+        """Stop accepting connections; safe to call from any thread."""
+        if not self._stopping.is_set():
+            self._stopping.set()
+            threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        """Serve until stopped, then drain the connections already accepted.
+
+        Connections still queued for a thread are not in flight yet, so the
+        drain waits for every accepted connection rather than for the
+        in-flight requests; those left at the deadline are abandoned.
+        """
+        super().serve_forever(poll_interval)
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+        drained = not finish_drain(self.app, self.wait_pending)
+        self.pool.shutdown(wait=drained, cancel_futures=not drained)
+        if self.priority_pool is not None:
+            self.priority_pool.shutdown(wait=drained, cancel_futures=not drained)
+
+
+class PreforkServer:
+    """Master process managing a set of pre-forked worker processes.
+
+    Signals handled by the master:
+        ``SIGTERM``/``SIGINT``: stop the workers gracefully and exit
+        ``SIGUSR2``: replace every worker, starting each replacement before
+        stopping the worker it replaces
+        ``SIGHUP``: reload the configuration in the master, so that future
+        workers inherit it, and forward the signal to every worker
+
+    Attributes:
+        app: Flask application served by the workers
+        workers: Number of worker processes
+        threads: Number of request threads per worker
+        priority_threads: Number of threads per worker reserved for the
+            priority lane
+
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        app: Flask,
+        host: str,
+        port: int,
+        workers: int,
+        threads: int,
+        max_requests: int = 0,
+        max_requests_jitter: int = 0,
+        graceful_timeout: float = 30,
+        priority_threads: int = 0,
+    ) -> None:
+        """Configure the master; no process is started until ``run``."""
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.threads = threads
+        self.priority_threads = priority_threads
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self._listeners: list[socket.socket] = []
+        self._slots: dict[int, int] = {}  # Worker pid -> listener slot
+        self._wakeup_read = -1
+        self._stopping = False
+        self._reload_requested = False
+        self._config_reload_requested = False
+
+    def run(self) -> None:
+        """Start the workers and supervise them until asked to stop."""
+        self._listeners = [
+            create_listener(self.host, self.port) for _ in range(self.workers)
+        ]
+        self._install_signal_handlers()
+
+        logger.info(
+            "Starting pre-fork server on %s:%s with %d workers x %d threads",
+            self.host, self.port, self.workers, self.threads,
+        )
+        for slot in range(self.workers):
+            self.spawn_worker(slot)
+
+        while not self._stopping:
+            if self._config_reload_requested:
+                self._config_reload_requested = False
+                self.reload_config()
+            if self._reload_requested:
+                self._reload_requested = False
+                self.reload()
+            self._reap_workers(respawn=True)
+            self._wait_for_signal(MASTER_POLL_INTERVAL)
+
+        self.stop()
+        for listener in self._listeners:
+            listener.close()
+
+    def spawn_worker(self, slot: int) -> int:
+        """Fork a worker for a listener slot and wait until it is serving.
+
+        Args:
+            slot: Index of the listener the worker accepts from
+
+        Returns:
+            int: Process id of the new worker
+
+        """
+        ready_read, ready_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            self._run_worker(slot, ready_write)  # Never returns
+
+        os.close(ready_write)
+        self._slots[pid] = slot
+        readable, _, _ = select.select([ready_read], [], [], WORKER_BOOT_TIMEOUT)
+        if not readable:
+            logger.warning("Worker %d did not report ready in time", pid)
+        os.close(ready_read)
+        logger.info("Worker %d started on slot %d", pid, slot)
+        return pid
+
+    def reload(self) -> None:
+        """Replace every worker, one slot at a time."""
+        logger.info("Reloading %d workers", len(self._slots))
+        for pid, slot in list(self._slots.items()):
+            self.spawn_worker(slot)
+            self._signal_worker(pid, signal.SIGTERM)
+            self._wait_worker(pid, self.graceful_timeout)
+
+    def reload_config(self) -> None:
+        """Reload the configuration of the master and of every live worker."""
+        reload_config(self.app)
+        for pid in list(self._slots):
+            self._signal_worker(pid, signal.SIGHUP)
+
+    def stop(self) -> None:
+        """Stop every worker, killing those that outlive the graceful timeout."""
+        logger.info("Stopping %d workers", len(self._slots))
+        for pid in list(self._slots):
+            self._signal_worker(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + self.graceful_timeout
+        while self._slots and time.monotonic() < deadline:
+            self._reap_workers(respawn=False)
+            self._wait_for_signal(0.05)
+
+        for pid in list(self._slots):
+            logger.warning("Worker %d did not stop in time, killing it", pid)
+            self._signal_worker(pid, signal.SIGKILL)
+            self._wait_worker(pid, None)
+
+    def _install_signal_handlers(self) -> None:
+        """Handle the master signals and wake the master loop on each of them."""
+        self._wakeup_read, wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(wakeup_write, False)
+        signal.set_wakeup_fd(wakeup_write)
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGUSR2, self._handle_reload)
+        signal.signal(signal.SIGHUP, self._handle_config_reload)
+        # Only installed so exiting workers wake the master up right away
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+
+    def _wait_for_signal(self, timeout: float) -> None:
+        """Sleep until a signal arrives or ``timeout`` seconds have passed."""
+        select.select([self._wakeup_read], [], [], timeout)
+        try:
+            while os.read(self._wakeup_read, 64):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _handle_stop(self, signum: int, frame: FrameType | None) -> None:  # noqa: ARG002
+        self._stopping = True
+
+    def _handle_reload(self, signum: int, frame: FrameType | None) -> None:  # noqa: ARG002
+        self._reload_requested = True
+
+    def _handle_config_reload(self, signum: int, frame: FrameType | None) -> None:  # noqa: ARG002
+        self._config_reload_requested = True
+
+    def _signal_worker(self, pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            self._slots.pop(pid, None)
+
+    def _wait_worker(self, pid: int, timeout: float | None) -> None:
+        """Wait for one worker to exit, killing it after ``timeout`` seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while pid in self._slots:
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done = pid
+            if done:
+                self._slots.pop(pid, None)
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.warning("Worker %d did not stop in time, killing it", pid)
+                self._signal_worker(pid, signal.SIGKILL)
+                deadline = None
+            self._wait_for_signal(0.05)
+
+    def _reap_workers(self, *, respawn: bool) -> None:
+        """Collect exited workers and optionally replace them."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot = self._slots.pop(pid, None)
+            if slot is None:
+                continue
+            logger.info(
+                "Worker %d exited with code %s", pid, os.waitstatus_to_exitcode(status),
+            )
+            if respawn and not self._stopping:
+                self.spawn_worker(slot)
+
+    def _run_worker(self, slot: int, ready_fd: int) -> None:
+        """Serve requests in a forked worker process, then exit."""
+        exit_code = 0
+        try:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGUSR2, signal.SIG_IGN)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            install_reload_handler(self.app)
+
+            max_requests = self.max_requests
+            if max_requests and self.max_requests_jitter:
+                # Spread recycling so workers do not restart together
+                max_requests += random.randint(0, self.max_requests_jitter)  # noqa: S311
+
+            server = PooledWSGIServer(
+                self.host,
+                self.port,
+                self.app,
+                self.threads,
+                max_requests,
+                fd=self._listeners[slot].fileno(),
+                priority_threads=self.priority_threads,
+            )
+            install_drain_handler(self.app, server.stop)
+            # Each slot holds its share of the budget, restored from its own file
+            self.app.limiter_snapshots.start(slot)
+
+            os.write(ready_fd, b"1")
+            os.close(ready_fd)
+            server.serve_forever()
+            logger.info(
+                "Worker %d stopped after %d requests",
+                os.getpid(), server.handled_requests,
+            )
+        except BaseException:
+            logger.exception("Worker %d failed", os.getpid())
+            exit_code = 1
+        finally:
+            stop_logging()
+            logging.shutdown()
+            os._exit(exit_code)
+
+
+def run_prefork(app: Flask, host: str, port: int) -> None:
+    """Serve the application with the pre-fork server.
+
+    Args:
+        app: Flask application to serve
+        host: Interface to bind
+        port: Port to listen on
+
+    """
+    PreforkServer(
+        app,
+        host=host,
+        port=port,
+        workers=app.config["SERVER_WORKERS"],
+        threads=app.config["SERVER_THREADS"],
+        max_requests=app.config["SERVER_MAX_REQUESTS"],
+        max_requests_jitter=app.config["SERVER_MAX_REQUESTS_JITTER"],
+        graceful_timeout=app.config["SERVER_GRACEFUL_TIMEOUT"],
+        priority_threads=app.config["SERVER_PRIORITY_THREADS"],
+    ).run()
+
+def run_wsgi(app: Flask, host: str, port: int) -> None:
+    """Serve the application with the threaded Werkzeug server, draining on exit.
+
+    Args:
+        app: Flask application to serve
+        host: Interface to bind
+        port: Port to listen on
+
+    """
+    server = make_server(host, port, app, threaded=True)
+    install_drain_handler(app, server.shutdown)
+    logger.info("Serving with the threaded WSGI server on %s:%s", host, port)
+    server.serve_forever()
+    finish_drain(app)
+    server.server_close()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Microbenchmarks of the request hot paths with a stored-baseline regression check.
+
+Each case is measured on its own, in one process:
+
+- ``format_retry_time``, ``ratelimit_handler``, ``hello_world``, the limiter
+  check, ``after_request`` (with its ``before_request``) and the ``/metrics``
+  page, called directly inside a request context
+- full ``GET /``, ``GET /health``, ``GET /metrics`` and rejected ``GET /``
+  requests through the test client
+
+For every case the script reports the best time per call and two
+allocation figures from a separate, traced pass: ``peak_bytes``, the largest
+amount of memory a single call had allocated at once, and ``blocks``, the
+median number of memory blocks a call left allocated (garbage included).
+
+The results are compared to a stored baseline (by default
+``benchmarks/baselines/hotpaths.json``) and the script exits with status 1 if
+a figure grew beyond the threshold. Times are first scaled by the ratio of a
+pure-Python calibration loop timed in both runs, so a slower or busier machine
+does not read as a regression.
+
+Usage:
+    python benchmarks/hotpaths.py                      # compare to the baseline
+    python benchmarks/hotpaths.py --update-baseline    # record a new baseline
+    python benchmarks/hotpaths.py --case limiter_check --case after_request
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+from werkzeug.exceptions import TooManyRequests
+
+APP_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "hotpaths.json"
+
+# Left-over blocks a case may gain before failing, whatever the threshold;
+# one more dict or string kept alive is not a regression on its own
+BLOCKS_SLACK = 2
+
+# Calls between two resets of the limiter storage, so the moving window
+# never holds more entries than a real one would
+LIMITER_BATCH = 50
+
+
+class Case:
+    """A benchmarked callable and the optional reset run between batches."""
+
+    def __init__(self, func: Callable[[], object],
+                 reset: Callable[[], object] | None = None) -> None:
+        """Benchmark ``func``, calling ``reset`` untimed every ``LIMITER_BATCH`` calls."""
+        self.func = func
+        self.reset = reset
+
+
+def build_cases() -> dict[str, Case]:
+    """Create the applications and the benchmarked callables."""
+    sys.path.insert(0, str(APP_DIR))
+    os.environ.setdefault("FLASK_ENV", "production")
+    from appflask.app import create_app
+    from appflask.errors import format_retry_time, ratelimit_handler
+    from appflask.metrics import metrics
+    from appflask.reload import apply_config
+    from appflask.routes import hello_world
+
+    # Keep the figures about the code, not about writing log lines
+    logging.disable(logging.CRITICAL)
+
+    app = create_app()
+    apply_config(app, {**app.settings, "RATE_LIMIT_REQUESTS_PER_MINUTE": 10 ** 6})
+    rejecting_app = create_app()
+    apply_config(rejecting_app, {**rejecting_app.settings,
+                                 "RATE_LIMIT_REQUESTS_PER_MINUTE": 0})
+
+    context = app.test_request_context("/health")
+    context.push()
+    error = TooManyRequests()
+
+    def after_request() -> None:
+        metrics.before_request()
+        metrics.after_request(app.response_class())
+
+    client = app.test_client()
+    rejecting_client = rejecting_app.test_client()
+    reset_limiter = app.limiter.reset
+
+    return {
+        "format_retry_time": Case(lambda: format_retry_time(75)),
+        "ratelimit_handler": Case(lambda: ratelimit_handler(error)),
+        "hello_world": Case(hello_world),
+        "limiter_check": Case(app.limiter.check, reset_limiter),
+        "after_request": Case(after_request),
+        "metrics_page": Case(metrics.metrics),
+        "request_hello": Case(lambda: client.get("/").close(), reset_limiter),
+        "request_health": Case(lambda: client.get("/health").close(), reset_limiter),
+        "request_metrics": Case(lambda: client.get("/metrics").close(), reset_limiter),
+        "request_rejected": Case(lambda: rejecting_client.get("/").close()),
+    }
+
+
+def time_case(case: Case, number: int, repeat: int) -> float:
+    """Return the best over ``repeat`` runs of the time per call in nanoseconds.
+
+    As with ``timeit``, the best run is kept because noise only ever adds
+    time, and the garbage collector is paused so that a collection triggered
+    by earlier garbage is not charged to the case.
+    """
+    runs = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            elapsed = 0
+            for start in range(0, number, LIMITER_BATCH):
+                if case.reset is not None:
+                    case.reset()
+                calls = range(min(LIMITER_BATCH, number - start))
+                begin = time.perf_counter_ns()
+                for _ in calls:
+                    case.func()
+                elapsed += time.perf_counter_ns() - begin
+            runs.append(elapsed / number)
+    finally:
+        gc.enable()
+    return min(runs)
+
+
+def calibration() -> None:
+    """Fixed pure-Python workload timed alongside the cases to gauge the machine."""
+    values = {}
+    for index in range(200):
+        values[str(index)] = index * 2
+    sorted(values.items(), key=lambda item: -item[1])
+
+
+def trace_case(case: Case, calls: int) -> tuple[int, int]:
+    """Return the median peak bytes and left-over blocks of single calls."""
+    peaks, blocks = [], []
+    tracemalloc.start()
+    try:
+        for index in range(calls):
+            if case.reset is not None and index % LIMITER_BATCH == 0:
+                case.reset()
+            before_blocks = sys.getallocatedblocks()
+            before_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            case.func()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before_bytes)
+            blocks.append(sys.getallocatedblocks() - before_blocks)
+    finally:
+        tracemalloc.stop()
+    return int(statistics.median(peaks)), int(statistics.median(blocks))
+
+
+def run(args: argparse.Namespace) -> dict[str, dict[str, float]]:
+    """Measure every selected case."""
+    cases = build_cases()
+    selected = args.case or list(cases)
+    results = {
+        "calibration": {"ns_per_call": round(time_case(Case(calibration),
+                                                       args.number, args.repeat))},
+    }
+    for name in selected:
+        case = cases[name]
+        for _ in range(args.number // 10):  # Warm up caches and lazy setup
+            case.func()
+        peak_bytes, blocks = trace_case(case, args.trace_calls)
+        results[name] = {
+            "ns_per_call": round(time_case(case, args.number, args.repeat)),
+            "peak_bytes": peak_bytes,
+            "blocks": blocks,
+        }
+    return results
+
+
+def compare(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]],
+            threshold: float) -> list[str]:
+    """Return the figures that regressed beyond ``threshold`` times the baseline."""
+    speed = 1.0
+    if "calibration" in baseline:
+        speed = (baseline["calibration"]["ns_per_call"]
+                 / results["calibration"]["ns_per_call"])
+    regressions = []
+    for name, figures in results.items():
+        if name == "calibration" or name not in baseline:
+            continue
+        for metric, value in figures.items():
+            if metric not in baseline[name]:
+                continue
+            scaled = round(value * speed) if metric == "ns_per_call" else value
+            limit = max(baseline[name][metric], 1) * threshold
+            if metric == "blocks":
+                limit = max(limit, baseline[name][metric] + BLOCKS_SLACK)
+            if scaled > limit:
+                regressions.append(
+                    f"{name}.{metric}: {scaled} > {threshold} x {baseline[name][metric]}",
+                )
+    return regressions
+
+
+def main() -> None:
+    """Parse arguments, run the benchmarks and check them against the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--case", action="append",
+                        help="Case to run (repeatable); all cases by default")
+    parser.add_argument("--number", type=int, default=1000,
+                        help="Calls per timed run")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Timed runs per case; the best is kept")
+    parser.add_argument("--trace-calls", type=int, default=50,
+                        help="Calls traced for the allocation figures")
+    parser.add_argument("--threshold", type=float, default=1.5,
+                        help="Allowed ratio to the baseline before failing")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+    baseline = args.baseline
+
+    results = run(args)
+    print(json.dumps(results, indent=2))
+
+    if args.update_baseline:
+        baseline.parent.mkdir(exist_ok=True)
+        stored = json.loads(baseline.read_text()) if baseline.exists() else {}
+        baseline.write_text(json.dumps({**stored, **results}, indent=2) + "\n")
+        return
+
+    if not baseline.exists():
+        print(f"No baseline at {baseline}; run with --update-baseline")
+        return
+
+    regressions = compare(results, json.loads(baseline.read_text()), args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
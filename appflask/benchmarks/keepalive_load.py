@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Keep-alive load test comparing the threaded WSGI and the ASGI servers.
+
+The script starts ``main.py`` once per server mode, opens many concurrent
+keep-alive connections, sends a few requests over each of them and reports
+throughput and server memory per open connection as JSON.
+
+Usage:
+    python benchmarks/keepalive_load.py --connections 10000 --mode both
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+
+def read_rss_bytes(pid: int) -> int:
+    """Return the resident set size of a process in bytes."""
+    with Path(f"/proc/{pid}/status").open() as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def start_server(mode: str, port: int) -> subprocess.Popen:
+    """Start the application with the requested server mode."""
+    env = {**os.environ, "APPFLASK_SERVER": mode, "APPFLASK_PORT": str(port),
+           "FLASK_ENV": "production"}
+    return subprocess.Popen(  # noqa: S603
+        [sys.executable, str(APP_DIR / "main.py")],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    """Wait until the server accepts connections."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+        except OSError:
+            await asyncio.sleep(0.2)
+            continue
+        writer.close()
+        return
+    msg = f"Server did not start listening on port {port}"
+    raise RuntimeError(msg)
+
+
+async def send_request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    path: str,
+) -> tuple[int, bool]:
+    """Send one GET request and return the status and whether to keep alive."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    keep_alive = True
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+        elif name.lower() == "connection" and value.strip().lower() == "close":
+            keep_alive = False
+    await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def run_load(args: argparse.Namespace, pid: int) -> dict:
+    """Open the connections, hold them idle, then drive requests over them."""
+    connect_gate = asyncio.Semaphore(args.connect_concurrency)
+    connections = []
+    failed = 0
+
+    async def connect() -> None:
+        nonlocal failed
+        async with connect_gate:
+            try:
+                connections.append(
+                    await asyncio.open_connection("127.0.0.1", args.port),
+                )
+            except OSError:
+                failed += 1
+
+    rss_before = read_rss_bytes(pid)
+    await asyncio.gather(*(connect() for _ in range(args.connections)))
+
+    # Drive requests over every connection; they stay open afterwards
+    statuses: Counter = Counter()
+    start = time.perf_counter()
+
+    reconnects = 0
+
+    async def drive(index: int) -> None:
+        nonlocal reconnects
+        reader, writer = connections[index]
+        for _ in range(args.requests):
+            try:
+                status, keep_alive = await asyncio.wait_for(
+                    send_request(reader, writer, args.path), args.timeout,
+                )
+                statuses[status] += 1
+                if not keep_alive:
+                    # The server refused keep-alive; pay for a new connection
+                    writer.close()
+                    reader, writer = await asyncio.open_connection(
+                        "127.0.0.1", args.port,
+                    )
+                    connections[index] = (reader, writer)
+                    reconnects += 1
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                statuses["error"] += 1
+                return
+
+    await asyncio.gather(*(drive(index) for index in range(len(connections))))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(args.settle)
+    rss_open = read_rss_bytes(pid)
+
+    for _, writer in connections:
+        writer.close()
+
+    completed = sum(count for status, count in statuses.items() if status != "error")
+    open_connections = len(connections)
+    return {
+        "connections_requested": args.connections,
+        "connections_open": open_connections,
+        "connections_failed": failed,
+        "requests_completed": completed,
+        "reconnects": reconnects,
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(completed / elapsed, 1) if elapsed else 0.0,
+        "rss_idle_bytes": rss_before,
+        "rss_loaded_bytes": rss_open,
+        "rss_per_connection_bytes": (
+            round((rss_open - rss_before) / open_connections)
+            if open_connections else None
+        ),
+    }
+
+
+def benchmark(mode: str, args: argparse.Namespace) -> dict:
+    """Run the load test against one server mode."""
+    server = start_server(mode, args.port)
+    try:
+        asyncio.run(wait_for_port(args.port))
+        result = asyncio.run(run_load(args, server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {"mode": mode, **result}
+
+
+def main() -> None:
+    """Parse arguments, run the requested modes and print a JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["wsgi", "asgi", "both"], default="both")
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=5,
+                        help="Requests sent over each keep-alive connection")
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--connect-concurrency", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="Seconds to wait for each response")
+    parser.add_argument("--settle", type=float, default=1.0,
+                        help="Seconds to wait before sampling memory")
+    args = parser.parse_args()
+
+    # Every connection needs a descriptor on both ends of the loopback
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    modes = ["wsgi", "asgi"] if args.mode == "both" else [args.mode]
+    print(json.dumps([benchmark(mode, args) for mode in modes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Soak test of the application over simulated hours, failing on upward trends.
+
+Slow growth in the limiter storage, the metric label children or the logging
+buffers only shows up after days in a pod, as an OOM kill. This script drives
+one application in-process at a steady rate of mixed traffic: greetings over
+the rate limit, so both 200s and 429s, 404s on ever new paths, and periodic
+probes and scrapes. It compresses time with a manual clock, which moves by
+the request interval after every request instead of waiting for it.
+
+Every ``--sample-minutes`` of simulated time it records:
+
+- ``rss_bytes``: resident set size of the process
+- ``traced_bytes``: memory allocated by Python, from ``tracemalloc``; tracing
+  makes every request several times slower, so ``--no-tracemalloc`` turns it
+  off for runs about latency
+- ``limiter_entries``: counters, expirations and moving-window entries held
+  by the limiter storage
+- ``metric_samples``: samples exposed by the metrics registry
+- ``log_buffered``: records waiting in the logging queue plus open sampling
+  windows
+- ``p50_us`` and ``p99_us``: wall-clock latency percentiles of the requests
+  of the interval
+
+The samples of the first ``--settle-hours`` are left out while caches fill
+and the first rate limit window starts, and a least-squares slope per
+simulated hour is fitted to the rest. The script prints a JSON report and
+exits with status 1 if a slope exceeds its maximum.
+
+Usage:
+    python benchmarks/soak.py                                    # 6 simulated hours
+    python benchmarks/soak.py --hours 48 --rate 20 --no-tracemalloc
+    python benchmarks/soak.py --max-slope rss_bytes=524288 --max-slope p99_us=100
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+# Largest slope per simulated hour each sampled figure may show
+DEFAULT_MAX_SLOPES = {
+    "rss_bytes": 1024 * 1024,
+    "traced_bytes": 256 * 1024,
+    "limiter_entries": 10,
+    "metric_samples": 1,
+    "log_buffered": 10,
+    "p50_us": 20,
+    "p99_us": 200,
+}
+
+# Share of the requests going to each kind of traffic; the rest are greetings
+NOT_FOUND_SHARE = 0.1
+PROBE_SHARE = 0.05
+
+# Simulated seconds between two scrapes of /metrics
+SCRAPE_INTERVAL = 15
+
+
+def current_rss() -> int:
+    """Return the resident set size of the process in bytes.
+
+    Reads ``/proc`` where available; elsewhere falls back to the peak RSS,
+    which can only grow and so still reveals a leak.
+    """
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def limiter_entries(app: Flask) -> int:
+    """Return the number of entries held by the in-memory limiter storage."""
+    storage = app.limiter.storage
+    return (len(storage.storage) + len(storage.expirations)
+            + sum(len(entries) for entries in storage.events.values()))
+
+
+def metric_samples() -> int:
+    """Return the number of samples exposed by the metrics registry."""
+    from appflask.metrics import CUSTOM_REGISTRY
+    return sum(len(metric.samples) for metric in CUSTOM_REGISTRY.collect())
+
+
+def slope(points: list[tuple[float, float]]) -> float:
+    """Return the least-squares slope of ``(x, y)`` points, 0 for fewer than two."""
+    if len(points) < 2:  # noqa: PLR2004
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Drive the application and sample it over the simulated hours."""
+    sys.path.insert(0, str(APP_DIR))
+    os.environ.setdefault("FLASK_ENV", "production")
+    from appflask.app import create_app
+    from appflask.clock import ManualClock
+    from appflask.loadgen import LatencyHistogram
+    from appflask.logs import buffered_records, stop_logging
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    clock = ManualClock()
+    app = create_app(clock)
+    client = app.test_client()
+    rng = random.Random(args.seed)
+
+    interval = 1 / args.rate
+    sample_every = args.sample_minutes * 60
+    duration = args.hours * 3600
+    start = clock.time()
+    next_sample = start + sample_every
+    next_scrape = start
+    missing = 0
+    statuses: dict[int, int] = {}
+    latency = LatencyHistogram()
+    samples = []
+
+    while clock.time() - start < duration:
+        now = clock.time()
+        if now >= next_scrape:
+            path, next_scrape = "/metrics", next_scrape + SCRAPE_INTERVAL
+        else:
+            draw = rng.random()
+            if draw < NOT_FOUND_SHARE:
+                missing += 1
+                path = f"/missing/{missing}"
+            elif draw < NOT_FOUND_SHARE + PROBE_SHARE:
+                path = rng.choice(("/health", "/ready"))
+            else:
+                path = "/"
+
+        began = time.perf_counter_ns()
+        response = client.get(path)
+        response.close()
+        latency.record(max(1, (time.perf_counter_ns() - began) // 1000))
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        clock.advance(interval)
+
+        if clock.time() >= next_sample:
+            next_sample += sample_every
+            samples.append({
+                "hours": round((clock.time() - start) / 3600, 4),
+                "rss_bytes": current_rss(),
+                "traced_bytes": tracemalloc.get_traced_memory()[0],  # 0 untraced
+                "limiter_entries": limiter_entries(app),
+                "metric_samples": metric_samples(),
+                "log_buffered": buffered_records(),
+                "p50_us": latency.value_at_percentile(50),
+                "p99_us": latency.value_at_percentile(99),
+            })
+            latency = LatencyHistogram()
+
+    tracemalloc.stop()
+    stop_logging()
+    settled = [sample for sample in samples if sample["hours"] > args.settle_hours]
+    slopes = {
+        name: round(slope([(sample["hours"], sample[name]) for sample in settled]), 3)
+        for name in DEFAULT_MAX_SLOPES
+    }
+    return {
+        "hours": args.hours,
+        "rate": args.rate,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "samples": samples,
+        "slopes_per_hour": slopes,
+    }
+
+
+def check(slopes: dict[str, float], max_slopes: dict[str, float]) -> list[str]:
+    """Return the figures trending upward faster than allowed."""
+    return [
+        f"{name}: {slopes[name]}/h > {limit}/h"
+        for name, limit in max_slopes.items()
+        if slopes[name] > limit
+    ]
+
+
+def parse_slope(value: str) -> tuple[str, float]:
+    """Parse a ``NAME=SLOPE`` argument."""
+    name, _, limit = value.partition("=")
+    if name not in DEFAULT_MAX_SLOPES:
+        msg = f"unknown figure {name!r}, expected one of {', '.join(DEFAULT_MAX_SLOPES)}"
+        raise argparse.ArgumentTypeError(msg)
+    return name, float(limit)
+
+
+def main() -> None:
+    """Parse arguments, run the soak test and check the trends."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, default=6,
+                        help="Simulated hours of traffic")
+    parser.add_argument("--rate", type=float, default=3,
+                        help="Requests per simulated second")
+    parser.add_argument("--sample-minutes", type=float, default=10,
+                        help="Simulated minutes between two samples")
+    parser.add_argument("--settle-hours", type=float, default=0.5,
+                        help="Simulated hours left out of the trends")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the traffic mix")
+    parser.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false",
+                        help="Do not trace Python allocations")
+    parser.add_argument("--max-slope", type=parse_slope, action="append", default=[],
+                        metavar="NAME=SLOPE",
+                        help="Largest slope per simulated hour of a figure (repeatable)")
+    args = parser.parse_args()
+
+    # The log lines still go through the logging queue, just not to the terminal
+    with Path(os.devnull).open("w") as devnull, contextlib.redirect_stderr(devnull):
+        report = run(args)
+    failures = check(report["slopes_per_hour"],
+                     {**DEFAULT_MAX_SLOPES, **dict(args.max_slope)})
+    print(json.dumps(report, indent=2))
+    for failure in failures:
+        print(f"TREND {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Startup benchmark with a stored-baseline regression check.
+
+The script measures, each in fresh processes:
+
+- ``import_seconds``: time to import ``appflask.app``
+- ``first_response_seconds``: time from launching the server to the first
+  ``200`` from ``/health``
+- ``peak_rss_bytes``: peak resident memory of the server after that response
+
+The medians are compared to a stored baseline (by default
+``benchmarks/baselines/startup.json``) and the script exits with status 1 if
+a metric grew beyond the threshold.
+
+Usage:
+    python benchmarks/startup.py                      # compare to the baseline
+    python benchmarks/startup.py --update-baseline    # record a new baseline
+    python benchmarks/startup.py --command dist/appflask/appflask  # a bundle
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shlex
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "startup.json"
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import appflask.app; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def free_port() -> int:
+    """Return a port that is currently free on the loopback interface."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def read_peak_rss_bytes(pid: int) -> int:
+    """Return the peak resident set size of a process and its children in bytes.
+
+    The children matter for the onefile bundle, whose bootloader process only
+    unpacks the archive and runs the application in a child process.
+    """
+    peak = 0
+    with Path(f"/proc/{pid}/status").open() as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                peak = int(line.split()[1]) * 1024
+    children = Path(f"/proc/{pid}/task/{pid}/children").read_text().split()
+    return peak + sum(read_peak_rss_bytes(int(child)) for child in children)
+
+
+def measure_import() -> float:
+    """Import the application module in a fresh interpreter."""
+    output = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_response(command: list[str], timeout: float) -> tuple[float, int]:
+    """Launch the server and wait for its first successful response."""
+    port = free_port()
+    env = {**os.environ, "APPFLASK_PORT": str(port)}
+    start = time.perf_counter()
+    server = subprocess.Popen(  # noqa: S603
+        command, cwd=APP_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + timeout
+        while time.perf_counter() < deadline:
+            try:
+                with urllib.request.urlopen(  # noqa: S310
+                    f"http://127.0.0.1:{port}/health", timeout=1,
+                ) as response:
+                    if response.status == 200:  # noqa: PLR2004
+                        elapsed = time.perf_counter() - start
+                        return elapsed, read_peak_rss_bytes(server.pid)
+            except (urllib.error.URLError, OSError):
+                time.sleep(0.01)
+        msg = f"No response from {command} within {timeout} seconds"
+        raise RuntimeError(msg)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def run(args: argparse.Namespace) -> dict[str, float]:
+    """Run every measurement ``args.runs`` times and keep the medians."""
+    command = shlex.split(args.command)
+    imports, responses, peaks = [], [], []
+    for _ in range(args.runs):
+        imports.append(measure_import())
+        elapsed, peak = measure_first_response(command, args.timeout)
+        responses.append(elapsed)
+        peaks.append(peak)
+    return {
+        "import_seconds": round(statistics.median(imports), 4),
+        "first_response_seconds": round(statistics.median(responses), 4),
+        "peak_rss_bytes": int(statistics.median(peaks)),
+    }
+
+
+def compare(results: dict[str, float], baseline: dict[str, float],
+            threshold: float) -> list[str]:
+    """Return the metrics that regressed beyond ``threshold`` times the baseline."""
+    return [
+        f"{name}: {value} > {threshold} x {baseline[name]}"
+        for name, value in results.items()
+        if name in baseline and value > baseline[name] * threshold
+    ]
+
+
+def main() -> None:
+    """Parse arguments, measure startup and check it against the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--command", default=f"{sys.executable} main.py",
+                        help="Command starting the server (e.g. a PyInstaller bundle)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--threshold", type=float, default=1.5,
+                        help="Allowed ratio to the baseline before failing")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE,
+                        help="Baseline file, e.g. one per bundle mode")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+    baseline = args.baseline
+
+    results = run(args)
+    print(json.dumps(results, indent=2))
+
+    if args.update_baseline:
+        baseline.parent.mkdir(exist_ok=True)
+        baseline.write_text(json.dumps(results, indent=2) + "\n")
+        return
+
+    if not baseline.exists():
+        print(f"No baseline at {baseline}; run with --update-baseline")
+        return
+
+    regressions = compare(results, json.loads(baseline.read_text()), args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""First-request latency benchmark with and without the startup warmup.
+
+Each run builds the application in a fresh interpreter, with ``APPFLASK_WARMUP``
+set to ``1`` or ``0``, then times its first requests through the test client,
+cycling over the hot routes and ending with a request rejected by the rate
+limiter. The per-request medians across runs are printed as JSON, together
+with the time spent in ``create_app``.
+
+Usage:
+    python benchmarks/warmup.py --runs 5 --requests 20
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+RUN_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+from appflask.app import create_app
+from appflask.reload import apply_config
+app = create_app()
+create_seconds = time.perf_counter() - start
+client = app.test_client()
+requests = [
+    ("GET", "/", None), ("GET", "/health", None), ("GET", "/metrics", None),
+    ("POST", "/batch", {"queries": ["greeting", "health"]}),
+]
+latencies = []
+for index in range(int(sys.argv[1])):
+    method, path, body = requests[index % len(requests)]
+    start = time.perf_counter()
+    client.open(path, method=method, json=body).close()
+    latencies.append(time.perf_counter() - start)
+apply_config(app, {**app.settings, "RATE_LIMIT_REQUESTS_PER_MINUTE": 1})
+start = time.perf_counter()
+status = client.get("/").status_code
+print(json.dumps({"create_seconds": create_seconds, "latencies": latencies,
+                  "rejected_seconds": time.perf_counter() - start, "status": status}))
+"""
+
+
+def measure(warmup: bool, requests: int) -> dict:
+    """Build the application in a fresh interpreter and time its first requests."""
+    env = {**os.environ, "APPFLASK_WARMUP": "1" if warmup else "0",
+           "FLASK_ENV": "production"}
+    output = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", RUN_SNIPPET, str(requests)],
+        cwd=APP_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples: list[dict]) -> dict:
+    """Keep the median of every measurement across runs, in milliseconds."""
+    def median_ms(values: list[float]) -> float:
+        return round(statistics.median(values) * 1000, 3)
+
+    latencies = list(zip(*(sample["latencies"] for sample in samples)))
+    return {
+        "create_app_ms": median_ms([sample["create_seconds"] for sample in samples]),
+        "first_request_ms": median_ms(list(latencies[0])),
+        "first_n_total_ms": median_ms([sum(sample["latencies"]) for sample in samples]),
+        "per_request_ms": [median_ms(list(values)) for values in latencies],
+        "first_429_ms": median_ms([sample["rejected_seconds"] for sample in samples]),
+    }
+
+
+def main() -> None:
+    """Parse arguments, measure both variants and print a JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=20,
+                        help="Number of first requests timed in each run")
+    args = parser.parse_args()
+
+    report = {
+        name: summarize([measure(warmup, args.requests) for _ in range(args.runs)])
+        for name, warmup in (("without_warmup", False), ("with_warmup", True))
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
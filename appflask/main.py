@@ -38,8 +38,28 @@ def main() -> None:
         )
 
         host = "0.0.0.0"
-        port = 5000
-        app.run(host=host, port=port)
+        port = int(os.getenv("APPFLASK_PORT", "5000"))
+        server = app.config["SERVER_MODE"]
+
+        if server != "prefork":
+            # The pre-fork master forwards SIGHUP to its workers itself
+            from appflask.reload import install_reload_handler
+            install_reload_handler(app)
+            # Pre-fork workers snapshot their own limiter state
+            app.limiter_snapshots.start()
+
+        if server == "asgi":
+            from appflask.asgi import run_asgi
+            logger.info("Serving with the ASGI server on port %s", port)
+            run_asgi(app, host=host, port=port)
+        elif server == "prefork":
+            from appflask.server import run_prefork
+            run_prefork(app, host=host, port=port)
+        elif app.debug:
+            app.run(host=host, port=port)
+        else:
+            from appflask.server import run_wsgi
+            run_wsgi(app, host=host, port=port)
 
     except ImportError as e:
         logger.exception("Import error: %s", e)
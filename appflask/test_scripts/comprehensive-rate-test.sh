@@ -27,46 +27,15 @@ rate_limited_requests=0
 other_errors=0
 start_time=$(date +%s)
 
-# Function to make a request and process the response
-make_request() {
-    local request_num=$1
-    local response_code
-    local retry_after
-    
-    # Capture both status code and headers
-    response=$(curl -s -i "$APP_URL$ENDPOINT")
-    response_code=$(echo "$response" | grep -E "^HTTP/[0-9.]+ [0-9]+" | awk '{print $2}')
-    
-    # Check for Retry-After header if rate limited
-    if [[ "$response_code" == "429" ]]; then
-        retry_after=$(echo "$response" | grep -i "Retry-After" | awk '{print $2}' | tr -d '\r')
-    fi
-    
-    case $response_code in
-        200|201)
-            echo -n -e "${GREEN}.${NC}"
-            ((successful_requests++))
-            ;;
-        429)
-            if [[ -n "$retry_after" ]]; then
-                echo -n -e "${RED}R(${retry_after}s)${NC}"
-            else
-                echo -n -e "${RED}R${NC}"
-            fi
-            ((rate_limited_requests++))
-            ;;
-        *)
-            echo -n -e "${YELLOW}E(${response_code})${NC}"
-            ((other_errors++))
-            ;;
-    esac
-    
-    # Print a newline every 25 requests for readability
-    if (( request_num % 25 == 0 )); then
-        echo " ($request_num)"
-    fi
-    
-    return $response_code
+# The load is generated by the project's asyncio load generator, which keeps
+# connections open instead of starting one curl process per request
+APP_DIR="$(cd "$(dirname "$0")/.." && pwd)"
+REPORT_FILE=$(mktemp)
+trap 'rm -f "$REPORT_FILE"' EXIT
+
+# Read a value from the load generator report
+report_value() {
+    python3 -c "import json, sys; r = json.load(open(sys.argv[1])); print($1)" "$REPORT_FILE"
 }
 
 # Function to query Prometheus
@@ -136,34 +105,22 @@ fi
 # Calculate expected duration
 expected_duration=$((TOTAL_REQUESTS / REQUESTS_PER_SECOND))
 echo -e "${BLUE}Test will take approximately ${expected_duration} seconds${NC}"
-echo -e "${BLUE}Legend: ${GREEN}.${BLUE} = success, ${RED}R${BLUE} = rate limited, ${YELLOW}E${BLUE} = other error${NC}"
 echo
 
 # Perform the test
 echo -e "${CYAN}Starting test...${NC}"
+PYTHONPATH="$APP_DIR" python3 -m appflask.loadgen \
+    --url "$APP_URL$ENDPOINT" \
+    --rate "$REQUESTS_PER_SECOND" \
+    --requests "$TOTAL_REQUESTS" \
+    --output "$REPORT_FILE" || exit 1
 
-# Track the first rate limit occurrence
-first_rate_limit_time=0
-first_rate_limit_request=0
-
-for ((i=1; i<=TOTAL_REQUESTS; i++)); do
-    make_request $i
-    response_code=$?
-    
-    # Track first rate limit occurrence
-    if [[ $response_code -eq 429 && $first_rate_limit_time -eq 0 ]]; then
-        first_rate_limit_time=$(date +%s)
-        first_rate_limit_request=$i
-    fi
-    
-    # Sleep to maintain the requested rate
-    # Skip sleep on the last request
-    if (( i < TOTAL_REQUESTS )); then
-        sleep $(bc -l <<< "scale=4; 1/$REQUESTS_PER_SECOND")
-    fi
-done
+successful_requests=$(report_value "r['statuses'].get('200', {}).get('count', 0)")
+rate_limited_requests=$(report_value "r['statuses'].get('429', {}).get('count', 0)")
+other_errors=$(report_value "r['requests_sent'] - $successful_requests - $rate_limited_requests")
 
-echo  # Final newline after the progress indicators
+# Time of the first rate limited response, relative to the start of the load
+first_rate_limit_seconds=$(report_value "r['statuses'].get('429', {}).get('first_seconds') or ''")
 
 # Calculate test duration
 end_time=$(date +%s)
@@ -183,11 +140,12 @@ echo "Successful requests:  $successful_requests"
 echo "Rate limited:         $rate_limited_requests"
 echo "Other errors:         $other_errors"
 echo "Total requests:       $((successful_requests + rate_limited_requests + other_errors))"
-echo "Actual request rate:  $(bc -l <<< "scale=2; ($successful_requests + $rate_limited_requests + $other_errors)/$test_duration") requests/second"
+echo "Actual request rate:  $(report_value "r['throughput_rps']") requests/second"
+echo "Latency p50/p99 (200): $(report_value "'%s / %s ms' % tuple(r['statuses'].get('200', {}).get('latency', {}).get('percentiles_ms', {}).get(p) for p in ('p50', 'p99'))")"
+echo "Latency p50/p99 (429): $(report_value "'%s / %s ms' % tuple(r['statuses'].get('429', {}).get('latency', {}).get('percentiles_ms', {}).get(p) for p in ('p50', 'p99'))")"
 
-if [[ $first_rate_limit_time -gt 0 ]]; then
-    rate_limit_time_seconds=$((first_rate_limit_time - start_time))
-    echo "Rate limit triggered: After $rate_limit_time_seconds seconds ($first_rate_limit_request requests)"
+if [[ -n "$first_rate_limit_seconds" ]]; then
+    echo "Rate limit triggered: After $first_rate_limit_seconds seconds ($successful_requests requests)"
 fi
 
 echo
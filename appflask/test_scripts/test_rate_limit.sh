@@ -23,30 +23,15 @@ rate_limited_requests=0
 other_errors=0
 start_time=$(date +%s)
 
-# Function to make a request and process the response
-make_request() {
-    local request_num=$1
-    local response=$(curl -s -o /dev/null -w "%{http_code}" "$APP_URL$ENDPOINT")
-    
-    case $response in
-        200|201)
-            echo -n -e "${GREEN}.${NC}"
-            ((successful_requests++))
-            ;;
-        429)
-            echo -n -e "${RED}R${NC}"
-            ((rate_limited_requests++))
-            ;;
-        *)
-            echo -n -e "${YELLOW}E${NC}"
-            ((other_errors++))
-            ;;
-    esac
-    
-    # Print a newline every 50 requests for readability
-    if (( request_num % 50 == 0 )); then
-        echo " ($request_num)"
-    fi
+# The load is generated by the project's asyncio load generator, which keeps
+# connections open instead of starting one curl process per request
+APP_DIR="$(cd "$(dirname "$0")/.." && pwd)"
+REPORT_FILE=$(mktemp)
+trap 'rm -f "$REPORT_FILE"' EXIT
+
+# Read a value from the load generator report
+report_value() {
+    python3 -c "import json, sys; r = json.load(open(sys.argv[1])); print($1)" "$REPORT_FILE"
 }
 
 # Check if app is reachable
@@ -70,22 +55,19 @@ echo
 # Calculate expected duration
 expected_duration=$((TOTAL_REQUESTS / REQUESTS_PER_SECOND))
 echo -e "${BLUE}Test will take approximately ${expected_duration} seconds${NC}"
-echo -e "${BLUE}Legend: ${GREEN}.${BLUE} = success, ${RED}R${BLUE} = rate limited, ${YELLOW}E${BLUE} = other error${NC}"
 echo
 
 # Perform the test
 echo -e "${CYAN}Starting test...${NC}"
-for ((i=1; i<=TOTAL_REQUESTS; i++)); do
-    make_request $i
-    
-    # Sleep to maintain the requested rate
-    # Skip sleep on the last request
-    if (( i < TOTAL_REQUESTS )); then
-        sleep $(bc -l <<< "scale=4; 1/$REQUESTS_PER_SECOND")
-    fi
-done
-
-echo  # Final newline after the progress indicators
+PYTHONPATH="$APP_DIR" python3 -m appflask.loadgen \
+    --url "$APP_URL$ENDPOINT" \
+    --rate "$REQUESTS_PER_SECOND" \
+    --requests "$TOTAL_REQUESTS" \
+    --output "$REPORT_FILE" || exit 1
+
+successful_requests=$(report_value "r['statuses'].get('200', {}).get('count', 0)")
+rate_limited_requests=$(report_value "r['statuses'].get('429', {}).get('count', 0)")
+other_errors=$(report_value "r['requests_sent'] - $successful_requests - $rate_limited_requests")
 
 # Calculate test duration
 end_time=$(date +%s)
@@ -104,7 +86,8 @@ echo "Successful requests:  $successful_requests"
 echo "Rate limited:         $rate_limited_requests"
 echo "Other errors:         $other_errors"
 echo "Total requests:       $((successful_requests + rate_limited_requests + other_errors))"
-echo "Actual request rate:  $(bc -l <<< "scale=2; ($successful_requests + $rate_limited_requests + $other_errors)/$duration") requests/second"
+echo "Actual request rate:  $(report_value "r['throughput_rps']") requests/second"
+echo "Latency p50/p99:      $(report_value "'%s / %s ms' % (r['latency']['percentiles_ms']['p50'], r['latency']['percentiles_ms']['p99'])")"
 echo
 
 # Check if rate limiting was triggered
@@ -2,11 +2,17 @@
 
 This module contains tests for the main Flask application.
 """
+import json
 import logging
 import os
+import subprocess
+import sys
 import pytest
 
 from appflask.app import create_app
+from appflask.metrics import CUSTOM_REGISTRY
+from appflask.reload import apply_config
+from appflask.warmup import warm_up
 
 logger = logging.getLogger(__name__)
 
@@ -43,4 +49,77 @@ def test_hello_world(client):
     # Check each component of the message
     assert "Hello, my name is" in message, f"Missing greeting in message: {message}"
     assert "version" in message, f"Missing version in message: {message}"
-    assert "the time is" in message, f"Missing time in message: {message}"
\ No newline at end of file
+    assert "the time is" in message, f"Missing time in message: {message}"
+def test_batch(client):
+    """Test that the batch endpoint answers several queries in one response."""
+    response = client.post("/batch", json={"queries": ["greeting", "health", "health"]})
+    assert response.status_code == 200, f"Expected 200 OK, got {response.status_code}"
+
+    results = response.json["results"]
+    assert [result["query"] for result in results] == ["greeting", "health", "health"]
+    assert "Hello, my name is" in results[0]["message"]
+    assert results[1]["status"] == "healthy"
+
+def test_batch_rejects_invalid_queries(client):
+    """Test that malformed or unknown batch queries return 400."""
+    assert client.post("/batch", json={}).status_code == 400
+    assert client.post("/batch", json={"queries": ["unknown"]}).status_code == 400
+    assert client.post("/batch", json={"queries": ["health"] * 51}).status_code == 400
+
+def test_batch_limiter_cost(client):
+    """Test that a batch call is charged the configured cost, not one hit per query."""
+    queries = {"queries": ["health"] * 10}
+    before = int(client.post("/batch", json=queries).headers["X-RateLimit-Remaining"])
+    after = int(client.post("/batch", json=queries).headers["X-RateLimit-Remaining"])
+    assert before - after == client.application.config["BATCH_REQUEST_COST"]
+
+def test_stream(client):
+    """Test that the stream endpoint pushes NDJSON updates."""
+    app = client.application
+    apply_config(app, {**app.settings, "STREAM_INTERVAL_SECONDS": 0})
+    response = client.get("/stream?queries=greeting,health&count=3")
+    assert response.status_code == 200, f"Expected 200 OK, got {response.status_code}"
+    assert response.mimetype == "application/x-ndjson"
+
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [line["seq"] for line in lines] == [0, 1, 2]
+    assert lines[0]["results"][1] == {"query": "health", "status": "healthy"}
+
+def test_import_has_no_side_effects():
+    """Test that importing the application modules does not build an app."""
+    code = (
+        "import appflask.app, appflask.errors, appflask.limiter, appflask.metrics; "
+        "assert appflask.app._app is None; "
+        "assert appflask.metrics.metrics.start_time is None"
+    )
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=app_dir, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "Starting Flask application" not in result.stderr
+
+def test_ready_after_warmup(client):
+    """Test that the app reports ready and warmup left the budget untouched."""
+    response = client.get("/ready")
+    assert response.status_code == 200, f"Expected 200 OK, got {response.status_code}"
+    assert response.json["status"] == "ready"
+
+    response = client.get("/")
+    limit = int(response.headers["X-RateLimit-Limit"])
+    assert int(response.headers["X-RateLimit-Remaining"]) == limit - 1
+
+def test_warmup_is_not_recorded(client):
+    """Test that warmup requests are not counted in the request metrics."""
+    sample = ("appflask_http_requests_total", {
+        "endpoint": "main.health_check", "method": "GET", "status": "200",
+    })
+    before = CUSTOM_REGISTRY.get_sample_value(sample[0], sample[1])
+    warm_up(client.application)
+    assert CUSTOM_REGISTRY.get_sample_value(sample[0], sample[1]) == before
+
+def test_not_ready_before_warmup(client):
+    """Test that the readiness check fails until the ready flag is set."""
+    client.application.ready.clear()
+    response = client.get("/ready")
+    assert response.status_code == 503, f"Expected 503, got {response.status_code}"
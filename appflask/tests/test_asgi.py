@@ -0,0 +1,100 @@
+"""Tests for the ASGI entry point.
+
+This module drives the ASGI application directly, without a server, and checks
+that it serves the same routes, rate limiting and metrics as the WSGI app.
+"""
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from appflask.asgi import create_asgi_app
+from appflask.reload import apply_config
+
+
+def call(asgi_app, path, method="GET", query=b"", body=b""):
+    """Send one HTTP request through the ASGI app and collect the response."""
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "path": path,
+        "query_string": query,
+        "headers": [(b"host", b"testserver"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("testserver", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+
+    start = messages[0]
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    data = b"".join(message.get("body", b"") for message in messages[1:])
+    return start["status"], headers, data
+
+@pytest.fixture
+def asgi_app():
+    """Create an ASGI app around a fresh Flask application."""
+    return create_asgi_app()
+
+def test_asgi_health(asgi_app):
+    """Test that the health endpoint is served over ASGI."""
+    status, headers, data = call(asgi_app, "/health")
+    assert status == 200, f"Expected 200 OK, got {status}"
+    assert json.loads(data) == {"status": "healthy"}
+    assert "x-ratelimit-remaining" not in headers  # Probes are exempt
+
+def test_asgi_batch(asgi_app):
+    """Test that request bodies reach the Flask app."""
+    body = json.dumps({"queries": ["health", "greeting"]}).encode()
+    status, _, data = call(asgi_app, "/batch", method="POST", body=body)
+    assert status == 200, f"Expected 200 OK, got {status}"
+    assert [result["query"] for result in json.loads(data)["results"]] == ["health", "greeting"]
+
+def test_asgi_stream(asgi_app):
+    """Test that streaming responses are forwarded chunk by chunk."""
+    app = asgi_app.wsgi_app
+    apply_config(app, {**app.settings, "STREAM_INTERVAL_SECONDS": 0})
+    status, headers, data = call(asgi_app, "/stream", query=b"count=2")
+    assert status == 200, f"Expected 200 OK, got {status}"
+    assert headers["content-type"] == "application/x-ndjson"
+    assert len(data.decode().splitlines()) == 2
+
+def test_asgi_metrics(asgi_app):
+    """Test that the metrics endpoint is served over ASGI."""
+    call(asgi_app, "/health")
+    status, _, data = call(asgi_app, "/metrics")
+    assert status == 200, f"Expected 200 OK, got {status}"
+    assert b"appflask_http_requests_total" in data
+
+def test_asgi_rate_limit(asgi_app):
+    """Test that the limiter and its error handler behave as in the WSGI app."""
+    limit = asgi_app.wsgi_app.config["RATE_LIMIT_REQUESTS_PER_MINUTE"]
+    for _ in range(limit):
+        call(asgi_app, "/")
+
+    status, headers, data = call(asgi_app, "/")
+    assert status == 429, f"Expected 429, got {status}"
+    assert "retry-after" in headers
+    assert json.loads(data)["code"] == 429
+
+def test_asgi_priority_lane_keeps_its_threads(asgi_app):
+    """Test that probes are answered while every user thread is busy."""
+    release = threading.Event()
+    for _ in range(asgi_app.wsgi_app.config["ASGI_MAX_WORKERS"]):
+        asgi_app.executor.submit(release.wait)
+    try:
+        with ThreadPoolExecutor(max_workers=1) as runner:
+            status, _, _ = runner.submit(call, asgi_app, "/health").result(timeout=5)
+        assert status == 200, f"Expected 200 OK, got {status}"
+    finally:
+        release.set()
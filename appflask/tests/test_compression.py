@@ -0,0 +1,107 @@
+"""Tests for the response compression.
+
+This module checks the codec negotiation, the size threshold, the cache of
+stable bodies, and measures the bytes saved and the CPU spent per response.
+"""
+import gzip
+import logging
+import time
+
+import pytest
+
+from appflask.app import create_app
+from appflask.clock import ManualClock
+from appflask.compression import CODECS, negotiate
+from appflask.reload import apply_config
+
+logger = logging.getLogger(__name__)
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+@pytest.fixture
+def app():
+    """Create an application whose scrapes share a snapshot for a minute."""
+    app = create_app(ManualClock())
+    apply_config(app, {**app.settings, "METRICS_SNAPSHOT_SECONDS": 60.0})
+    return app
+
+@pytest.mark.parametrize(("header", "expected"), [
+    ("gzip", "gzip"),
+    ("gzip, deflate", "gzip"),
+    ("GZIP;q=0.5", "gzip"),
+    ("gzip;q=0", None),
+    ("*", next(iter(CODECS))),
+    ("*, gzip;q=0", "br" if "br" in CODECS else None),
+    ("identity", None),
+    ("", None),
+])
+def test_negotiation(header, expected):
+    """Test that the codec follows the weights of the Accept-Encoding header."""
+    assert negotiate(header) == expected
+
+def test_small_bodies_are_sent_as_they_are(app):
+    """Test that bodies under the threshold are not compressed."""
+    response = app.test_client().get("/health", headers=GZIP)
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.get_json() == {"status": "healthy"}
+
+def test_metrics_are_compressed_once_per_snapshot(app):
+    """Test that scrapes within the snapshot window share one compressed body."""
+    client = app.test_client()
+    plain = client.get("/metrics").data
+    cache = app.compression_cache
+    first = client.get("/metrics", headers=GZIP)
+    second = client.get("/metrics", headers=GZIP)
+
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(first.data) == plain
+    assert second.data == first.data
+    assert (cache.misses, cache.hits) == (1, 1)
+
+    app.clock.advance(60)
+    client.get("/metrics", headers=GZIP)
+    assert cache.misses == 2
+
+def test_rejections_are_compressed_once(app):
+    """Test that rejections with the same retry time reuse their compressed body."""
+    apply_config(app, {**app.settings, "COMPRESSION_MIN_SIZE": 0})
+    client = app.test_client()
+    while client.get("/").status_code != 429:
+        pass
+    misses = app.compression_cache.misses
+
+    responses = [client.get("/", headers=GZIP) for _ in range(3)]
+    assert all(response.status_code == 429 for response in responses)
+    assert app.compression_cache.misses == misses + 1
+    body = gzip.decompress(responses[0].data)
+    assert b'"retry_after":60' in body.replace(b" ", b"")
+
+def test_bytes_saved_and_cpu_per_response(app):
+    """Measure the bytes saved and the CPU spent per compressed scrape."""
+    client = app.test_client()
+    runs = 50
+    # CPU of this thread only: the purge timers of the limiter storages of
+    # other applications also run in the process
+
+    def cpu_per_response(**kwargs):
+        start = time.thread_time()
+        for _ in range(runs):
+            response = client.get("/metrics", **kwargs)
+        return (time.thread_time() - start) / runs, response
+
+    plain_cpu, plain = cpu_per_response()
+    cached_cpu, compressed = cpu_per_response(headers=GZIP)
+    apply_config(app, {**app.settings, "COMPRESSION_CACHE_SIZE": 0})
+    uncached_cpu, _ = cpu_per_response(headers=GZIP)
+
+    saved = len(plain.data) - len(compressed.data)
+    logger.info(
+        "Scrape of %d bytes: %d bytes saved, CPU per response %.0fus plain, "
+        "%.0fus compressed from the cache, %.0fus compressed every time",
+        len(plain.data), saved, plain_cpu * 1e6, cached_cpu * 1e6, uncached_cpu * 1e6,
+    )
+    assert saved > len(plain.data) / 2
+    # The cache saves the compression itself, which costs more than a lookup
+    assert cached_cpu < uncached_cpu
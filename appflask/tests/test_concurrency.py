@@ -0,0 +1,76 @@
+"""Tests for the adaptive concurrency limit.
+
+This module checks how the limit adapts to latency and that requests beyond
+it are shed before the rate limiter and the view run.
+"""
+import pytest
+
+from appflask.app import create_app
+from appflask.clock import ManualClock
+from appflask.concurrency import AdaptiveConcurrencyLimiter
+from appflask.config import Config
+from appflask.metrics import CUSTOM_REGISTRY
+
+
+@pytest.fixture
+def limiter():
+    """Create a limiter starting at 10 requests."""
+    config = {**Config.to_dict(), "CONCURRENCY_INITIAL_LIMIT": 10}
+    return AdaptiveConcurrencyLimiter(config, ManualClock())
+
+def fill(limiter):
+    """Admit requests up to the limit."""
+    admitted = 0
+    while limiter.try_acquire():
+        admitted += 1
+    return admitted
+
+def test_limit_grows_while_latency_holds(limiter):
+    """Test that a limit in use grows while latency stays at the baseline."""
+    for _ in range(3):
+        assert fill(limiter) == int(limiter.limit)
+        for _ in range(limiter.in_flight):
+            limiter.release(0.010)
+    assert 11 < limiter.limit < 13
+
+def test_limit_backs_off_once_per_round(limiter):
+    """Test that a round of slow requests shrinks the limit once."""
+    fill(limiter)
+    limiter.release(0.010)
+    for _ in range(limiter.in_flight):
+        limiter.release(0.100)
+    assert limiter.limit == pytest.approx(10 * 0.9, abs=0.2)
+
+    limiter.clock.advance(0.200)
+    fill(limiter)
+    limiter.release(0.100)
+    assert limiter.limit == pytest.approx(10 * 0.9 * 0.9, abs=0.2)
+
+def test_idle_limit_does_not_move(limiter):
+    """Test that slow requests far below the limit do not shrink it."""
+    limiter.try_acquire()
+    limiter.release(0.010)
+    limiter.try_acquire()
+    limiter.release(1.0)
+    assert limiter.limit == 10
+
+def test_requests_beyond_limit_are_shed():
+    """Test that a full limit answers 503 before the rate limiter counts the request."""
+    app = create_app(ManualClock())
+    client = app.test_client()
+    remaining = int(client.get("/").headers["X-RateLimit-Remaining"])
+    before = CUSTOM_REGISTRY.get_sample_value("appflask_requests_shed_total")
+
+    admitted = fill(app.concurrency_limiter)
+    response = client.get("/")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.get_json()["retry_after"] == 1
+    assert CUSTOM_REGISTRY.get_sample_value("appflask_requests_shed_total") - before == 1
+
+    for _ in range(admitted):
+        app.concurrency_limiter.release(None)
+    response = client.get("/")
+    assert response.status_code == 200
+    assert int(response.headers["X-RateLimit-Remaining"]) == remaining - 1
+    assert app.concurrency_limiter.in_flight == 0
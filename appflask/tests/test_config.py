@@ -0,0 +1,89 @@
+"""Tests for the configuration snapshot and its hot reload.
+
+This module checks how the configuration is resolved and that a reload
+applies new limiter, message and metrics settings to a running application.
+"""
+import json
+
+import pytest
+
+from appflask.app import create_app
+from appflask.config import resolve_config
+from appflask.metrics import CUSTOM_REGISTRY
+from appflask.reload import reload_config
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    """Point the application at an empty JSON config file."""
+    path = tmp_path / "config.json"
+    path.write_text("{}")
+    monkeypatch.setenv("APPFLASK_CONFIG_FILE", str(path))
+    return path
+
+@pytest.fixture
+def client(config_file):
+    """Create and return a test client for an app reading the config file."""
+    app = create_app()
+    with app.test_client() as client:
+        yield client
+
+def test_snapshot_is_read_only():
+    """Test that the resolved configuration cannot be modified in place."""
+    config = resolve_config()
+    with pytest.raises(TypeError):
+        config["RATE_LIMIT_REQUESTS_PER_MINUTE"] = 1
+
+def test_overrides(config_file, monkeypatch):
+    """Test that the environment and then the config file override the defaults."""
+    monkeypatch.setenv("APPFLASK_RATE_LIMIT", "40")
+    monkeypatch.setenv("APPFLASK_WARMUP", "0")
+    config_file.write_text(json.dumps({"BATCH_MAX_QUERIES": "10"}))
+
+    config = resolve_config()
+    assert config["RATE_LIMIT_REQUESTS_PER_MINUTE"] == 40
+    assert config["RATELIMIT_DEFAULT"] == "40 per 60 seconds"
+    assert config["WARMUP_ENABLED"] is False
+    assert config["BATCH_MAX_QUERIES"] == 10
+
+def test_reload_applies_new_limit(client, config_file):
+    """Test that a reload changes the limit and keeps the requests already counted."""
+    for _ in range(5):
+        client.get("/")
+
+    config_file.write_text(json.dumps({"RATE_LIMIT_REQUESTS_PER_MINUTE": 20}))
+    assert reload_config(client.application)
+
+    response = client.get("/")
+    assert int(response.headers["X-RateLimit-Limit"]) == 20
+    assert int(response.headers["X-RateLimit-Remaining"]) == 20 - 6
+
+    for _ in range(14):
+        client.get("/")
+    response = client.get("/")
+    assert response.status_code == 429, f"Expected 429, got {response.status_code}"
+    assert "allowed 20 requests" in response.json["message"]
+
+def test_reload_applies_metrics_settings(client, config_file):
+    """Test that a reload can stop the recording of request metrics."""
+    config_file.write_text(json.dumps({"METRICS_ENABLED": False}))
+    assert reload_config(client.application)
+
+    labels = {"method": "GET", "endpoint": "main.health_check", "status": "200"}
+    before = CUSTOM_REGISTRY.get_sample_value("appflask_http_requests_total", labels)
+    client.get("/health")
+    after = CUSTOM_REGISTRY.get_sample_value("appflask_http_requests_total", labels)
+    assert after == before
+
+def test_reload_rejects_invalid_config(client, config_file):
+    """Test that an invalid config file leaves the running configuration untouched."""
+    settings = client.application.settings
+    config_file.write_text(json.dumps({"UNKNOWN_KEY": 1}))
+    assert not reload_config(client.application)
+    assert client.application.settings is settings
+
+def test_reload_keeps_restart_only_keys(client, config_file):
+    """Test that server settings are not changed by a reload."""
+    config_file.write_text(json.dumps({"SERVER_WORKERS": 4}))
+    assert reload_config(client.application)
+    assert client.application.settings["SERVER_WORKERS"] == 1
@@ -0,0 +1,85 @@
+"""Tests for the graceful drain on shutdown.
+
+This module checks that a draining application fails its readiness probe,
+that the drain waits for the requests in flight until its deadline, and that
+the pooled server finishes a stream it accepted before it was stopped.
+"""
+import threading
+import urllib.request
+
+import pytest
+
+from appflask.app import create_app
+from appflask.drain import begin_drain, finish_drain
+from appflask.metrics import CUSTOM_REGISTRY
+from appflask.reload import apply_config
+from appflask.server import PooledWSGIServer
+
+DROPPED = "appflask_drain_requests_dropped_total"
+DURATION = "appflask_drain_duration_seconds"
+
+
+@pytest.fixture
+def app():
+    """Create an application with a short drain deadline."""
+    app = create_app()
+    apply_config(app, {**app.settings, "DRAIN_TIMEOUT_SECONDS": 0.5,
+                       "STREAM_INTERVAL_SECONDS": 0.2})
+    return app
+
+def test_readiness_fails_while_draining(app):
+    """Test that the readiness probe reports the drain."""
+    client = app.test_client()
+    assert client.get("/ready").status_code == 200
+    begin_drain(app)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.get_json() == {"status": "draining"}
+    assert client.get("/health").status_code == 200
+
+def test_drain_waits_for_in_flight_requests(app):
+    """Test that the drain ends when the last request in flight finishes."""
+    app.in_flight.start()
+    before = CUSTOM_REGISTRY.get_sample_value(DROPPED)
+    begin_drain(app)
+    threading.Timer(0.1, app.in_flight.finish).start()
+    assert finish_drain(app) == 0
+    assert 0.1 <= CUSTOM_REGISTRY.get_sample_value(DURATION) < 0.5
+    assert CUSTOM_REGISTRY.get_sample_value(DROPPED) == before
+
+def test_drain_drops_requests_at_the_deadline(app):
+    """Test that requests still running at the deadline are counted as dropped."""
+    app.in_flight.start()
+    before = CUSTOM_REGISTRY.get_sample_value(DROPPED)
+    begin_drain(app)
+    assert finish_drain(app) == 1
+    assert CUSTOM_REGISTRY.get_sample_value(DURATION) >= 0.5
+    assert CUSTOM_REGISTRY.get_sample_value(DROPPED) - before == 1
+    app.in_flight.finish()
+
+def test_stream_stays_in_flight_until_sent(app):
+    """Test that a streamed response is in flight until its body is closed."""
+    response = app.test_client().get("/stream?count=2", buffered=False)
+    assert app.in_flight.count == 1
+    response.close()
+    assert app.in_flight.count == 0
+
+def test_server_finishes_accepted_stream(app):
+    """Test that a stopped server completes the stream it was sending."""
+    server = PooledWSGIServer("127.0.0.1", 0, app, threads=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    before = CUSTOM_REGISTRY.get_sample_value(DROPPED)
+
+    url = f"http://127.0.0.1:{server.port}/stream?count=2"
+    with urllib.request.urlopen(url, timeout=5) as response:
+        first = response.readline()
+        begin_drain(app)
+        server.stop()
+        rest = response.read()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert b'"seq": 0' in first
+    assert b'"seq": 1' in rest
+    assert CUSTOM_REGISTRY.get_sample_value(DROPPED) == before
@@ -0,0 +1,54 @@
+"""Tests for the load generator.
+
+This module checks the latency histogram and runs short loads against the
+application in-process.
+"""
+import asyncio
+
+from appflask.app import create_app
+from appflask.loadgen import LatencyHistogram, parse_args, run
+from appflask.reload import apply_config
+
+
+def test_histogram_percentiles():
+    """Test that percentiles are reported within the histogram precision."""
+    histogram = LatencyHistogram()
+    for value in range(1, 100_001):
+        histogram.record(value)
+
+    assert histogram.count == 100_000
+    assert histogram.min == 1
+    assert histogram.max == 100_000
+    for percentile, expected in ((50, 50_000), (90, 90_000), (99, 99_000)):
+        value = histogram.value_at_percentile(percentile)
+        assert abs(value - expected) <= expected / 1000, (percentile, value)
+
+def test_histogram_corrects_coordinated_omission():
+    """Test that a stall also records the requests it held back."""
+    histogram = LatencyHistogram()
+    histogram.record_corrected(100_000, expected_interval=10_000)
+    assert histogram.count == 10
+    assert histogram.min == 10_000
+
+def test_open_loop_in_process():
+    """Test an open-loop run that splits latencies between 200 and 429."""
+    app = create_app()
+    apply_config(app, {**app.settings, "RATE_LIMIT_REQUESTS_PER_MINUTE": 20})
+
+    args = parse_args(["--in-process", "--path", "/", "--rate", "500",
+                       "--requests", "50"])
+    report = asyncio.run(run(args, app))
+
+    assert report["requests_completed"] == 50
+    assert report["errors"] == 0
+    assert report["statuses"]["200"]["count"] == 20
+    assert report["statuses"]["429"]["count"] == 30
+    assert report["statuses"]["429"]["latency"]["percentiles_ms"]["p50"] > 0
+
+def test_closed_loop_in_process():
+    """Test a closed-loop run stopping after a number of requests."""
+    args = parse_args(["--in-process", "--path", "/health", "--mode", "closed",
+                       "--concurrency", "4", "--requests", "20"])
+    report = asyncio.run(run(args, create_app()))
+    assert report["requests_sent"] == 20
+    assert report["requests_completed"] == 20
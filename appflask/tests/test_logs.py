@@ -0,0 +1,54 @@
+"""Tests for the logging module.
+
+This module checks the sampling of repeated records, the JSON output and the
+non-blocking queue handler.
+"""
+import json
+import logging
+import queue
+
+from appflask.logs import DroppingQueueHandler, JsonFormatter, SamplingFilter
+from appflask.metrics import CUSTOM_REGISTRY
+
+
+def make_record(name="appflask.errors", msg="Global rate limit exceeded: %s", args=("e",)):
+    """Create a warning record as a logger call would."""
+    return logging.makeLogRecord({
+        "name": name, "msg": msg, "args": args,
+        "levelno": logging.WARNING, "levelname": "WARNING",
+    })
+
+def test_sampling_aggregates_repeats():
+    """Test that repeats within the interval are replaced by one summary."""
+    sampler = SamplingFilter(60, ("appflask.errors",))
+    results = [sampler.filter(make_record()) for _ in range(10)]
+    assert results == [True] + [False] * 9
+
+    assert sampler.summaries() == []
+    (summary,) = sampler.summaries(force=True)
+    assert summary.suppressed == 9
+    assert summary.getMessage().startswith("9 more records like 'Global rate limit exceeded")
+
+def test_sampling_ignores_other_loggers():
+    """Test that only the configured loggers are sampled."""
+    sampler = SamplingFilter(60, ("appflask.errors",))
+    assert all(sampler.filter(make_record(name="appflask.server")) for _ in range(5))
+
+def test_json_formatter():
+    """Test that records are written as JSON objects with their extra fields."""
+    record = make_record()
+    record.suppressed = 3
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["level"] == "WARNING"
+    assert entry["message"] == "Global rate limit exceeded: e"
+    assert entry["suppressed"] == 3
+
+def test_queue_handler_drops_when_full():
+    """Test that a full queue drops records instead of blocking the caller."""
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    before = CUSTOM_REGISTRY.get_sample_value("appflask_log_records_dropped_total")
+    handler.handle(make_record())
+    handler.handle(make_record())
+    after = CUSTOM_REGISTRY.get_sample_value("appflask_log_records_dropped_total")
+    assert after - before == 1
+    assert handler.queue.get_nowait().msg == "Global rate limit exceeded: %s"
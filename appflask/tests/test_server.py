@@ -0,0 +1,141 @@
+"""Tests for the pre-fork production server.
+
+This module starts ``main.py`` in pre-fork mode and checks worker recycling,
+zero-downtime reloads and graceful shutdown over real HTTP connections, and
+checks the threads reserved for the priority lane on an in-process server.
+"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from appflask.app import create_app
+from appflask.metrics import CUSTOM_REGISTRY
+from appflask.server import PooledWSGIServer
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+WORKERS = 2
+
+
+def free_port():
+    """Return a port that is currently free on the loopback interface."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def get(port, path="/health", timeout=5):
+    """Send a GET request and return the status code and headers."""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=timeout) as response:
+            return response.status, response.headers
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers
+
+@pytest.fixture
+def server(tmp_path):
+    """Start the application in pre-fork mode and stop it after the test."""
+    port = free_port()
+    config_file = tmp_path / "config.json"
+    config_file.write_text("{}")
+    env = {
+        **os.environ,
+        "APPFLASK_CONFIG_FILE": str(config_file),
+        "APPFLASK_SERVER": "prefork",
+        "APPFLASK_PORT": str(port),
+        "APPFLASK_WORKERS": str(WORKERS),
+        "APPFLASK_THREADS": "4",
+        "APPFLASK_MAX_REQUESTS": "5",
+    }
+    process = subprocess.Popen([sys.executable, str(MAIN)], env=env)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            get(port)
+            break
+        except OSError:
+            time.sleep(0.2)
+    else:
+        process.kill()
+        pytest.fail("Pre-fork server did not start")
+
+    yield process, port, config_file
+
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+
+def test_prefork_serves_and_recycles(server):
+    """Test that requests keep succeeding while workers are recycled."""
+    _, port, _ = server
+    statuses = [get(port)[0] for _ in range(40)]
+    assert all(status in (200, 429) for status in statuses), statuses
+
+def test_prefork_splits_memory_rate_limit(server):
+    """Test that each worker enforces its share of the global budget."""
+    _, port, _ = server
+    _, headers = get(port, "/")
+    assert int(headers["X-RateLimit-Limit"]) == 100 // WORKERS
+
+def test_prefork_reload_without_downtime(server):
+    """Test that SIGUSR2 replaces workers while requests keep being served."""
+    process, port, _ = server
+    process.send_signal(signal.SIGUSR2)
+    deadline = time.monotonic() + 3
+    while time.monotonic() < deadline:
+        assert get(port)[0] in (200, 429)
+
+def test_prefork_config_reload(server):
+    """Test that SIGHUP applies a new rate limit in every worker without a restart."""
+    process, port, config_file = server
+    config_file.write_text('{"RATE_LIMIT_REQUESTS_PER_MINUTE": 40}')
+    process.send_signal(signal.SIGHUP)
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        limits = {int(get(port, "/")[1]["X-RateLimit-Limit"]) for _ in range(10)}
+        if limits == {40 // WORKERS}:
+            break
+        time.sleep(0.2)
+    assert limits == {40 // WORKERS}
+    assert process.poll() is None
+
+def test_prefork_graceful_shutdown(server):
+    """Test that SIGTERM stops the master and its workers cleanly."""
+    process, _, _ = server
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=30) == 0
+
+def test_priority_lane_keeps_its_threads():
+    """Test that probes are answered while every user thread is busy."""
+    server = PooledWSGIServer("127.0.0.1", 0, create_app(), threads=1, priority_threads=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    sample = ("appflask_lane_requests_total", {"lane": "priority", "outcome": "admitted"})
+    before = CUSTOM_REGISTRY.get_sample_value(*sample)
+    # Hold the only user thread with a request whose headers never end
+    blocker = socket.create_connection(("127.0.0.1", server.port))
+    try:
+        blocker.sendall(b"GET / HTTP/1.0\r\n")
+        time.sleep(0.2)
+
+        for _ in range(5):
+            assert get(server.port, "/health", timeout=2)[0] == 200
+        assert CUSTOM_REGISTRY.get_sample_value(*sample) - before == 5
+        with pytest.raises(OSError):
+            get(server.port, "/", timeout=0.5)
+
+        blocker.close()
+        assert get(server.port, "/")[0] == 200
+    finally:
+        blocker.close()
+        server.stop()
+        thread.join(timeout=10)
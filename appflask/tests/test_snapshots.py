@@ -0,0 +1,90 @@
+"""Tests for the limiter snapshots.
+
+This module checks that a restarted application restores the limiter state of
+the previous one, minus what expired while it was down, that snapshots are
+replaced whole, that an unreadable snapshot is ignored, and that a snapshot
+of the full budget stays small enough to write every second.
+"""
+import json
+
+import pytest
+
+from appflask.app import create_app
+from appflask.clock import ManualClock
+from appflask.metrics import CUSTOM_REGISTRY
+
+
+@pytest.fixture
+def snapshot_path(tmp_path, monkeypatch):
+    """Point the applications at a snapshot file of their own."""
+    path = tmp_path / "limiter.json"
+    monkeypatch.setenv("APPFLASK_LIMITER_SNAPSHOT", str(path))
+    return path
+
+def spend(client, count):
+    """Send ``count`` greetings and return how many were rate limited."""
+    return sum(client.get("/").status_code == 429 for _ in range(count))
+
+def test_restart_keeps_the_spent_budget(snapshot_path):
+    """Test that a restarted application does not grant the budget again."""
+    clock = ManualClock()
+    app = create_app(clock)
+    limit = app.settings["RATE_LIMIT_REQUESTS_PER_MINUTE"]
+    assert spend(app.test_client(), limit) == 0
+    assert app.limiter_snapshots.write()
+
+    clock.advance(5)  # Downtime
+    restarted = create_app(clock)
+    assert spend(restarted.test_client(), 1) == 1
+
+def test_entries_expired_during_downtime_are_dropped(snapshot_path):
+    """Test that the downtime counts toward the window of restored entries."""
+    clock = ManualClock()
+    app = create_app(clock)
+    limit = app.settings["RATE_LIMIT_REQUESTS_PER_MINUTE"]
+    client = app.test_client()
+    spend(client, limit // 2)
+    clock.advance(30)
+    spend(client, limit - limit // 2)
+    app.limiter_snapshots.write()
+
+    clock.advance(45)  # The first half is now older than the window
+    restarted = create_app(clock)
+    assert spend(restarted.test_client(), limit // 2) == 0
+    assert spend(restarted.test_client(), 1) == 1
+
+def test_snapshot_replaces_the_file_whole(snapshot_path):
+    """Test that a snapshot is written through a temporary file."""
+    app = create_app(ManualClock())
+    before = CUSTOM_REGISTRY.get_sample_value(
+        "appflask_limiter_snapshots_total", {"result": "written"}) or 0
+    spend(app.test_client(), 3)
+    app.limiter_snapshots.write()
+    app.limiter_snapshots.write()
+
+    assert [path.name for path in snapshot_path.parent.iterdir()] == ["limiter.json"]
+    assert json.loads(snapshot_path.read_text())["version"] == 1
+    assert CUSTOM_REGISTRY.get_sample_value(
+        "appflask_limiter_snapshots_total", {"result": "written"}) == before + 2
+
+def test_unreadable_snapshot_is_ignored(snapshot_path):
+    """Test that a truncated snapshot leaves the budget empty instead of failing."""
+    snapshot_path.write_text('{"version": 1, "limiter": {"taken_at"')
+    app = create_app(ManualClock())
+    assert app.limiter_snapshots.load() == 0
+    assert spend(app.test_client(), 1) == 0
+
+def test_snapshot_of_the_full_budget_is_compact(snapshot_path):
+    """Test that the snapshot stays small once the whole budget is spent."""
+    clock = ManualClock()
+    app = create_app(clock)
+    client = app.test_client()
+    for _ in range(app.settings["RATE_LIMIT_REQUESTS_PER_MINUTE"] * 2):
+        client.get("/")
+        clock.advance(0.1)
+    app.limiter_snapshots.write()
+
+    size = CUSTOM_REGISTRY.get_sample_value("appflask_limiter_snapshot_bytes")
+    assert size == snapshot_path.stat().st_size
+    # One entry per request of the window, for the global and route limits
+    assert size < 4096